@@ -5,3 +5,6 @@ class ApiConfig(AppConfig):
     name = "api"
     verbose_name = "API приложение"
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self) -> None:
+        from api import checks, signals  # noqa: F401
@@ -0,0 +1,113 @@
+import pickle
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from typing import Tuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+token_cache_timeout = settings.TOKEN_CACHE_TIMEOUT
+token_local_cache_timeout = settings.TOKEN_LOCAL_CACHE_TIMEOUT
+token_local_cache_size = settings.TOKEN_LOCAL_CACHE_SIZE
+
+User = get_user_model()
+
+
+class LocalCache:
+    def __init__(self, size: int, timeout: float) -> None:
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: str) -> bytes or None:
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self.lock:
+            self.items[key] = (monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            if len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.items.pop(key, None)
+
+
+local_tokens = LocalCache(token_local_cache_size, token_local_cache_timeout)
+
+
+def token_cache_key(key: str) -> str:
+    return f"auth:token:{sha256(key.encode()).hexdigest()}"
+
+
+def token_generation_key(key: str) -> str:
+    return f"{token_cache_key(key)}:generation"
+
+
+def forget_token(key: str) -> None:
+    cache_key = token_cache_key(key)
+    cache.set(token_generation_key(key), uuid4().hex, token_cache_timeout)
+    local_tokens.delete(cache_key)
+    cache.delete(cache_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key: str) -> Tuple:
+        cache_key = token_cache_key(key)
+        credentials = local_tokens.get(cache_key)
+        if credentials is None:
+            credentials = cache.get(cache_key)
+            if credentials is None:
+                credentials = self.cache_credentials(key)
+            else:
+                local_tokens.set(cache_key, credentials)
+
+        user, token = pickle.loads(credentials)
+        if not (user.is_active and user.active):
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return user, token
+
+    def cache_credentials(self, key: str) -> bytes:
+        cache_key = token_cache_key(key)
+        generation_key = token_generation_key(key)
+        generation = cache.get(generation_key)
+        credentials = pickle.dumps(self.load_credentials(key))
+        cache.add(cache_key, credentials, token_cache_timeout)
+        if cache.get(generation_key) != generation:
+            cache.delete(cache_key)
+        else:
+            local_tokens.set(cache_key, credentials)
+        return credentials
+
+    def load_credentials(self, key: str) -> Tuple:
+        try:
+            token = (
+                Token.objects.select_related("user")
+                .defer(
+                    "user__password",
+                    *(f"user__{field}" for field in User.counter_fields),
+                )
+                .get(key=key)
+            )
+        except Token.DoesNotExist:
+            raise AuthenticationFailed(_("Invalid token."))
+        return token.user, token
@@ -0,0 +1,80 @@
+from hashlib import md5
+from time import time
+from typing import Iterable
+
+from django.core.cache import cache
+from django.db.transaction import on_commit
+from rest_framework.request import Request
+
+
+def _now_version() -> int:
+    return int(time() * 1000)
+
+
+def author_version(author_id: int or None) -> str:
+    return f"recipes:author:{author_id}"
+
+
+def get_versions(*names: str) -> tuple:
+    keys = [f"version:{name}" for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: _now_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(*names: str) -> None:
+    keys = [f"version:{name}" for name in names]
+    current = cache.get_many(keys)
+    now = _now_version()
+    cache.set_many(
+        {key: max(current.get(key, 0) + 1, now) for key in keys}, None
+    )
+
+
+def version_timestamp(version: int) -> int:
+    return version // 1000
+
+
+def bump_version_on_commit(*names: str) -> None:
+    on_commit(lambda: bump_version(*names))
+
+
+def _incr_counter(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def record_hit(prefix: str) -> None:
+    _incr_counter(f"stats:{prefix}:hits")
+
+
+def record_miss(prefix: str) -> None:
+    _incr_counter(f"stats:{prefix}:misses")
+
+
+def cache_stats(prefix: str) -> dict:
+    hits, misses = f"stats:{prefix}:hits", f"stats:{prefix}:misses"
+    values = cache.get_many((hits, misses))
+    return {"hits": values.get(hits, 0), "misses": values.get(misses, 0)}
+
+
+def make_key(
+    prefix: str,
+    request: Request,
+    params: Iterable[str],
+    versions: tuple,
+    *parts,
+) -> str:
+    query = [request.get_host(), *map(str, parts)]
+    for param in params:
+        values = sorted(set(request.query_params.getlist(param)))
+        if values:
+            query.append(f"{param}={','.join(values)}")
+    digest = md5("|".join(query).encode()).hexdigest()
+    return f"{prefix}:{':'.join(map(str, versions))}:{digest}"
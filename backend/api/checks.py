@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core import checks
+
+process_local_backends = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches)
+def shared_cache_check(app_configs, **kwargs) -> list:
+    if settings.CACHES["default"]["BACKEND"] not in process_local_backends:
+        return []
+    return [
+        checks.Warning(
+            "Кэш по умолчанию хранится в памяти одного процесса.",
+            hint=(
+                "Версии кэша, которые меняют управляющие команды и другие "
+                "процессы gunicorn, не дойдут до остальных процессов, и "
+                "ответы с ETag останутся устаревшими. Укажите общий кэш в "
+                "CACHE_BACKEND, например PyMemcacheCache."
+            ),
+            id="api.W001",
+        )
+    ]
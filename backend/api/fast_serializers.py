@@ -0,0 +1,270 @@
+from collections import defaultdict
+from operator import attrgetter
+from typing import Dict, Iterable, List, Tuple
+
+from api.relations import get_relations
+from api.subscriptions import get_recipes_limit, latest_recipe_rows
+from django.db.models import Model, QuerySet
+from recipes.images import recipe_image_storage, rendition_urls
+from recipes.models import AmountIngredient, Recipe, Tag
+from rest_framework.request import Request
+
+tag_fields = "id", "name", "color", "slug"
+ingredient_fields = "id", "name", "measurement_unit"
+author_fields = "email", "id", "username", "first_name", "last_name"
+relation_fields = {"author", "is_favorited", "is_in_shopping_cart"}
+
+
+def value(row: dict or Model, field: str):
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def absolute_url(url: str, request: Request or None) -> str:
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def image_url(name: str, request: Request or None) -> str or None:
+    if not name:
+        return None
+    return absolute_url(recipe_image_storage.url(name), request)
+
+
+def renditions(name: str, ready: bool, request: Request or None) -> dict:
+    return {
+        rendition: {
+            image_format: absolute_url(url, request)
+            for image_format, url in urls.items()
+        }
+        for rendition, urls in rendition_urls(name, ready).items()
+    }
+
+
+def represent(
+    rows: List[dict or Model], fields: Tuple[str], getters: dict
+) -> List[dict]:
+    getters = [(field, getters[field]) for field in fields]
+    return [{field: get(row) for field, get in getters} for row in rows]
+
+
+class FastSerializer:
+    fields: Tuple[str] = ()
+    output_fields: Tuple[str] = ()
+
+    def __init__(
+        self, instance=None, many: bool = False, context: dict = None, **kw
+    ) -> None:
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @property
+    def request(self) -> Request or None:
+        return self.context.get("request")
+
+    @property
+    def requested_fields(self) -> Tuple[str]:
+        fields = self.context.get("fields")
+        return self.output_fields if fields is None else fields
+
+    @property
+    def data(self) -> List[dict] or dict:
+        if self.many:
+            return self.represent_many(list(self.instance))
+        return self.represent_many([self.instance])[0]
+
+    @classmethod
+    def values(
+        cls, queryset: QuerySet, fields: Tuple[str] or None = None
+    ) -> QuerySet:
+        return queryset.values(*cls.fields)
+
+    def represent_many(self, rows: List[dict or Model]) -> List[dict]:
+        return [
+            {field: value(row, field) for field in self.fields}
+            for row in rows
+        ]
+
+
+class FastTagSerializer(FastSerializer):
+    fields = tag_fields
+
+
+class FastIngredientSerializer(FastSerializer):
+    fields = ingredient_fields
+
+
+class FastShortRecipeSerializer(FastSerializer):
+    fields = "id", "name", "image", "renditions_ready", "cooking_time"
+
+    def represent_many(self, rows: List[dict]) -> List[dict]:
+        request = self.request
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "image": image_url(row["image"], request),
+                "renditions": renditions(
+                    row["image"], row["renditions_ready"], request
+                ),
+                "cooking_time": row["cooking_time"],
+            }
+            for row in rows
+        ]
+
+
+class FastSubscribeSerializer(FastSerializer):
+    output_fields = (
+        *author_fields,
+        "is_subscribed",
+        "recipes",
+        "recipes_count",
+    )
+
+    def represent_many(self, authors: List[Model]) -> List[dict]:
+        fields = self.requested_fields
+        recipes = defaultdict(list)
+        if "recipes" in fields:
+            for row in latest_recipe_rows(
+                [author.id for author in authors],
+                get_recipes_limit(self.request),
+            ):
+                recipes[row["author_id"]].append(row)
+
+        short = FastShortRecipeSerializer(context=self.context)
+        getters = {
+            **{field: attrgetter(field) for field in author_fields},
+            "is_subscribed": lambda author: True,
+            "recipes": lambda author: short.represent_many(
+                recipes[author.id]
+            ),
+            "recipes_count": lambda author: author.recipes_count,
+        }
+        return represent(authors, fields, getters)
+
+
+class FastRecipeSerializer(FastSerializer):
+    fields = (
+        "id",
+        "name",
+        "image",
+        "renditions_ready",
+        "text",
+        "cooking_time",
+        "pub_date",
+        "author_id",
+    )
+    output_fields = (
+        "id",
+        "tags",
+        "author",
+        "ingredients",
+        "is_favorited",
+        "is_in_shopping_cart",
+        "name",
+        "image",
+        "renditions",
+        "text",
+        "cooking_time",
+    )
+
+    @classmethod
+    def values(
+        cls, queryset: QuerySet, fields: Tuple[str] or None = None
+    ) -> QuerySet:
+        fields = cls.output_fields if fields is None else fields
+        columns = list(cls.fields)
+        if "text" not in fields:
+            columns.remove("text")
+        if "author" in fields:
+            columns.extend(f"author__{field}" for field in author_fields)
+        return queryset.values(*columns)
+
+    def tags_map(self, recipe_ids: Iterable[int]) -> Dict[int, List[dict]]:
+        tags = defaultdict(list)
+        rows = (
+            Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+            .order_by(*(f"tag__{field}" for field in Tag._meta.ordering))
+            .values("recipe_id", *(f"tag__{field}" for field in tag_fields))
+        )
+        for row in rows:
+            tags[row["recipe_id"]].append(
+                {field: row[f"tag__{field}"] for field in tag_fields}
+            )
+        return tags
+
+    def ingredients_map(
+        self, recipe_ids: Iterable[int]
+    ) -> Dict[int, List[dict]]:
+        ingredients = defaultdict(list)
+        rows = (
+            AmountIngredient.objects.filter(recipe_id__in=recipe_ids)
+            .order_by("ingredients__name")
+            .values(
+                "recipe_id",
+                "amount",
+                *(f"ingredients__{field}" for field in ingredient_fields),
+            )
+        )
+        for row in rows:
+            ingredients[row["recipe_id"]].append(
+                {
+                    **{
+                        field: row[f"ingredients__{field}"]
+                        for field in ingredient_fields
+                    },
+                    "amount": row["amount"],
+                }
+            )
+        return ingredients
+
+    def represent_many(self, rows: List[dict]) -> List[dict]:
+        if not rows:
+            return []
+
+        fields = self.requested_fields
+        request = self.request
+        recipe_ids = [row["id"] for row in rows]
+        tags = self.tags_map(recipe_ids) if "tags" in fields else {}
+        ingredients = (
+            self.ingredients_map(recipe_ids) if "ingredients" in fields else {}
+        )
+        relations = (
+            get_relations(request)
+            if relation_fields.intersection(fields)
+            else None
+        )
+        user_id = request.user.id
+
+        def author(row: dict) -> dict or None:
+            if row["author_id"] is None:
+                return None
+            return {
+                **{
+                    field: row[f"author__{field}"] for field in author_fields
+                },
+                "is_subscribed": (
+                    row["author_id"] != user_id
+                    and row["author_id"] in relations.subscriptions
+                ),
+            }
+
+        getters = {
+            "id": lambda row: row["id"],
+            "tags": lambda row: tags.get(row["id"], []),
+            "author": author,
+            "ingredients": lambda row: ingredients.get(row["id"], []),
+            "is_favorited": lambda row: row["id"] in relations.favorites,
+            "is_in_shopping_cart": lambda row: row["id"] in relations.carts,
+            "name": lambda row: row["name"],
+            "image": lambda row: image_url(row["image"], request),
+            "renditions": lambda row: renditions(
+                row["image"], row["renditions_ready"], request
+            ),
+            "text": lambda row: row["text"],
+            "cooking_time": lambda row: row["cooking_time"],
+        }
+        return represent(rows, fields, getters)
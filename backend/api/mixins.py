@@ -1,31 +1,227 @@
+from hashlib import md5
+from typing import Callable, List, Tuple
+
+from api.cache import (get_versions, make_key, record_hit, record_miss,
+                       version_timestamp)
+from api.fast_serializers import FastSerializer
+from api.relations import relations_version
 from django.conf import settings
-from django.db.models import Model, Q
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Model, QuerySet
+from django.db.transaction import atomic
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer
-from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
+from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED,
+                                   HTTP_204_NO_CONTENT, HTTP_304_NOT_MODIFIED,
                                    HTTP_400_BAD_REQUEST)
 
 add_methods = settings.ADD_METHODS
 del_methods = settings.DEL_METHODS
+response_cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
 
 
 class AddDelViewMixin:
     add_serializer: ModelSerializer or None = None
 
     def _add_del_obj(
-        self, obj_id: int or str, m2m_model: Model, q: Q
+        self,
+        obj_id: int or str,
+        m2m_model: Model,
+        field: str,
+        add_error: str = "Объект уже был добавлен!",
+        del_error: str = "Объект уже удален!",
     ) -> Response:
-        obj = get_object_or_404(self.queryset, id=obj_id)
-        serializer: ModelSerializer = self.add_serializer(obj)
-        m2m_obj = m2m_model.objects.filter(q & Q(user=self.request.user))
+        user = self.request.user
+        try:
+            obj_id = int(obj_id)
+        except (TypeError, ValueError):
+            raise Http404
 
-        if (self.request.method in add_methods) and not m2m_obj:
-            m2m_model(None, obj.id, self.request.user.id).save()
+        if self.request.method in add_methods:
+            obj = get_object_or_404(self.queryset, id=obj_id)
+            try:
+                with atomic():
+                    m2m_model.objects.create(user=user, **{field: obj})
+            except IntegrityError:
+                return Response(
+                    {"errors": add_error}, status=HTTP_400_BAD_REQUEST
+                )
+            serializer: ModelSerializer = self.add_serializer(
+                obj, context=self.get_serializer_context()
+            )
             return Response(serializer.data, status=HTTP_201_CREATED)
 
-        if (self.request.method in del_methods) and m2m_obj:
-            m2m_obj[0].delete()
-            return Response(status=HTTP_204_NO_CONTENT)
+        if self.request.method in del_methods:
+            deleted, _ = m2m_model.objects.filter(
+                user=user, **{f"{field}_id": obj_id}
+            ).delete()
+            if deleted:
+                return Response(status=HTTP_204_NO_CONTENT)
+            get_object_or_404(self.queryset, id=obj_id)
+            return Response({"errors": del_error}, status=HTTP_400_BAD_REQUEST)
 
         return Response(status=HTTP_400_BAD_REQUEST)
+
+
+class CachedResponseMixin:
+    cache_prefix: str = "responses"
+    cache_params: Tuple[str] = ()
+
+    def get_cache_versions(self) -> tuple:
+        return get_versions(self.cache_prefix)
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _cached_response(
+        self, handler: Callable, request: Request, *args, **kwargs
+    ) -> Response:
+        if not request.user.is_anonymous:
+            return handler(request, *args, **kwargs)
+
+        key = make_key(
+            self.cache_prefix,
+            request,
+            self.cache_params,
+            self.get_cache_versions(),
+            self.action,
+            *kwargs.values(),
+        )
+        data = cache.get(key)
+        if data is not None:
+            record_hit(self.cache_prefix)
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        record_miss(self.cache_prefix)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == HTTP_200_OK:
+            cache.set(key, response.data, response_cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class ConditionalGetMixin:
+    condition_versions: Tuple[str] = ()
+    condition_per_user: bool = False
+
+    def get_condition_versions(self) -> List[str] or None:
+        return list(self.condition_versions)
+
+    def get_last_modified(self) -> int or None:
+        return None
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return self._conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        return self._conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _conditional_response(
+        self, handler: Callable, request: Request, *args, **kwargs
+    ) -> Response:
+        names = self.get_condition_versions()
+        if names is None:
+            return handler(request, *args, **kwargs)
+
+        user_id = None
+        if self.condition_per_user and not request.user.is_anonymous:
+            user_id = request.user.id
+            names.append(relations_version(user_id))
+        versions = get_versions(*names)
+        last_modified = max(
+            (*map(version_timestamp, versions), self.get_last_modified() or 0)
+        )
+        etag = quote_etag(
+            md5(
+                "|".join(
+                    (
+                        request.get_host(),
+                        request.accepted_renderer.format,
+                        str(user_id),
+                        *map(str, kwargs.values()),
+                        *map(str, versions),
+                        *sorted(
+                            f"{key}={','.join(sorted(values))}"
+                            for key, values in request.query_params.lists()
+                        ),
+                    )
+                ).encode()
+            ).hexdigest()
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (HTTP_200_OK, HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ("Accept",))
+        return response
+
+
+class FastReadMixin:
+    fast_serializer_class: FastSerializer or None = None
+    fast_read_actions: Tuple[str] = ("list", "retrieve")
+
+    def use_fast_serializer(self) -> bool:
+        return (
+            settings.FAST_READ_SERIALIZERS
+            and self.fast_serializer_class is not None
+            and self.action in self.fast_read_actions
+        )
+
+    def get_serializer_class(self):
+        if self.use_fast_serializer():
+            return self.fast_serializer_class
+        return super().get_serializer_class()
+
+    def fast_values(self, queryset: QuerySet) -> QuerySet:
+        if self.use_fast_serializer():
+            return self.fast_serializer_class.values(
+                queryset, self.get_serializer_context().get("fields")
+            )
+        return queryset
+
+
+def split_param(values: List[str]) -> set:
+    return {
+        name.strip() for value in values for name in value.split(",") if name
+    }
+
+
+class SparseFieldsMixin:
+    sparse_fields: Tuple[str] = ()
+    sparse_actions: Tuple[str] = ("list", "retrieve")
+
+    def get_sparse_fields(self) -> Tuple[str]:
+        fields = self.sparse_fields
+        if self.action not in self.sparse_actions:
+            return fields
+
+        requested = split_param(self.request.query_params.getlist("fields"))
+        if requested & set(fields):
+            fields = tuple(field for field in fields if field in requested)
+        omitted = split_param(self.request.query_params.getlist("omit"))
+        return tuple(field for field in fields if field not in omitted)
+
+    def get_serializer_context(self) -> dict:
+        context = super().get_serializer_context()
+        context["fields"] = self.get_sparse_fields()
+        return context
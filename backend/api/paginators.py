@@ -1,19 +1,157 @@
-from recipes.models import Recipe
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+page_size = settings.PAGE_SIZE
+
+User = get_user_model()
+
+
+class CursorLimitPagination(CursorPagination):
+    page_size = page_size
+    page_size_query_param = "limit"
+    first_position: str or None = None
+    last_position: str or None = None
+
+    def __init__(self, ordering: tuple) -> None:
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request) or Cursor(
+            offset=0, reverse=False, position=None
+        )
+
+        ordering = self.ordering
+        if self.cursor.reverse:
+            ordering = tuple(
+                order[1:] if order.startswith("-") else f"-{order}"
+                for order in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        position = self.decode_position(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.cursor.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        if rows:
+            self.first_position = self.encode_position(rows[0])
+            self.last_position = self.encode_position(rows[-1])
+        self.page = rows
+        return rows
+
+    def after(self, ordering: tuple, position: tuple) -> Q:
+        (field, pk_field), (value, pk) = ordering, position
+        lookup = "lt" if field.startswith("-") else "gt"
+        pk_lookup = "lt" if pk_field.startswith("-") else "gt"
+        field = field.lstrip("-")
+        return Q(**{f"{field}__{lookup}": value}) | Q(
+            **{field: value, f"{pk_field.lstrip('-')}__{pk_lookup}": pk}
+        )
+
+    def encode_position(self, instance) -> str:
+        field = self.ordering[0].lstrip("-")
+        if isinstance(instance, dict):
+            value, pk = instance[field], instance["id"]
+        else:
+            value, pk = getattr(instance, field), instance.pk
+        return f"{value.isoformat()}|{pk}"
+
+    def decode_position(self, request) -> tuple or None:
+        cursor = self.decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return None
+
+        value, _, pk = cursor.position.rpartition("|")
+        try:
+            position = parse_datetime(value), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self) -> str or None:
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.last_position)
+        )
+
+    def get_previous_link(self) -> str or None:
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.first_position)
+        )
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    cursor_paginator: CursorLimitPagination or None = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, "cursor_ordering", None)
+        if ordering and self.cursor_query_param in request.query_params:
+            self.cursor_paginator = CursorLimitPagination(ordering)
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+
         response = super().get_paginated_response(data)
         author_id = self.request.query_params.get("author_id", None)
         if author_id:
-            author_recipe_count = Recipe.objects.filter(
-                author_id=author_id
-            ).count()
-            if author_recipe_count > self.page_size:
+            author_recipe_count = (
+                User.objects.filter(id=author_id)
+                .values_list("recipes_count", flat=True)
+                .first()
+            )
+            if author_recipe_count and author_recipe_count > self.page_size:
                 remaining_count = author_recipe_count - self.page_size
                 text = f"Ещё {remaining_count} рецептов..."
                 response.data["next"] = text
         return response
+
+
+class FeedPagination(CursorLimitPagination):
+    has_next = False
+
+    def __init__(self) -> None:
+        super().__init__(("-pub_date", "-id"))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        rows = queryset.page(
+            request.user.id, self.page_size + 1, self.decode_position(request)
+        )
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if rows:
+            pub_date, pk = rows[-1]
+            self.last_position = f"{pub_date.isoformat()}|{pk}"
+        return [pk for _, pk in rows]
+
+    def get_previous_link(self) -> None:
+        return None
@@ -1,6 +1,14 @@
 from rest_framework import permissions
 
 
+class AdminOrReadOnly(permissions.IsAuthenticated):
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and (
+            request.method in permissions.SAFE_METHODS
+            or request.user.is_staff
+        )
+
+
 class OwnerOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         return (
@@ -0,0 +1,50 @@
+from typing import FrozenSet, NamedTuple
+
+from api.cache import get_versions
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+
+relations_cache_timeout = settings.RELATIONS_CACHE_TIMEOUT
+
+
+class UserRelations(NamedTuple):
+    favorites: FrozenSet[int] = frozenset()
+    carts: FrozenSet[int] = frozenset()
+    subscriptions: FrozenSet[int] = frozenset()
+
+
+def relations_version(user_id: int) -> str:
+    return f"relations:{user_id}"
+
+
+def load_relations(user) -> UserRelations:
+    return UserRelations(
+        favorites=frozenset(
+            user.favorites.values_list("recipe_id", flat=True)
+        ),
+        carts=frozenset(user.carts.values_list("recipe_id", flat=True)),
+        subscriptions=frozenset(
+            user.subscriptions.values_list("author_id", flat=True)
+        ),
+    )
+
+
+def get_relations(request: Request) -> UserRelations:
+    relations = getattr(request, "_user_relations", None)
+    if relations is not None:
+        return relations
+
+    user = request.user
+    if user.is_anonymous:
+        relations = UserRelations()
+    else:
+        (version,) = get_versions(relations_version(user.id))
+        key = f"relations:{user.id}:{version}"
+        relations = cache.get(key)
+        if relations is None:
+            relations = load_relations(user)
+            cache.set(key, relations, relations_cache_timeout)
+
+    request._user_relations = relations
+    return relations
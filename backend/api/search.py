@@ -0,0 +1,169 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import unquote
+
+from api.cache import get_versions
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import (BooleanField, Exists, ExpressionWrapper,
+                              OuterRef, Q, QuerySet)
+from django.db.models.functions import Lower
+from recipes.models import Ingredient, Recipe, Tag
+
+ingredient_search_backend = settings.INGREDIENT_SEARCH_BACKEND
+
+layout = str.maketrans(
+    "qwertyuiop[]asdfghjkl;'zxcvbnm,./",
+    "йцукенгшщзхъфывапролджэячсмитьбю.",
+)
+ngram_size = 3
+user_search_fields = "username", "first_name", "last_name"
+
+
+def ngrams(text: str) -> Iterable[str]:
+    return {
+        text[i:i + ngram_size] for i in range(len(text) - ngram_size + 1)
+    }
+
+
+class IngredientIndex:
+    def __init__(self, ingredients: Iterable[Ingredient]) -> None:
+        self.ingredients: List[Ingredient] = sorted(
+            ingredients, key=lambda ing: (ing.name.casefold(), ing.id)
+        )
+        self.names: List[str] = [
+            ing.name.casefold() for ing in self.ingredients
+        ]
+        postings: Dict[str, List[int]] = {}
+        for position, name in enumerate(self.names):
+            for gram in ngrams(name):
+                postings.setdefault(gram, []).append(position)
+        self.postings: Dict[str, Tuple[int]] = {
+            gram: tuple(positions) for gram, positions in postings.items()
+        }
+
+    def _prefix_range(self, query: str) -> range:
+        start = bisect_left(self.names, query)
+        stop = bisect_right(self.names, query + "\U0010ffff", lo=start)
+        return range(start, stop)
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        if len(query) < ngram_size:
+            return range(len(self.names))
+        grams = sorted(
+            (self.postings.get(gram, ()) for gram in ngrams(query)), key=len
+        )
+        candidates = set(grams[0])
+        for positions in grams[1:]:
+            candidates.intersection_update(positions)
+        return sorted(candidates)
+
+    def search(
+        self, query: str, limit: int or None = None
+    ) -> List[Ingredient]:
+        query = query.casefold()
+        prefix = self._prefix_range(query)
+        found = list(prefix)
+        for position in self._candidates(query):
+            if limit is not None and len(found) >= limit:
+                break
+            if position not in prefix and query in self.names[position]:
+                found.append(position)
+        return [self.ingredients[position] for position in found[:limit]]
+
+
+_index: IngredientIndex or None = None
+_index_version: int or None = None
+
+
+def get_ingredient_index() -> IngredientIndex:
+    global _index, _index_version
+
+    (version,) = get_versions("ingredients")
+    if _index is None or _index_version != version:
+        _index = IngredientIndex(Ingredient.objects.all())
+        _index_version = version
+    return _index
+
+
+def preload_ingredient_index() -> None:
+    try:
+        get_ingredient_index()
+    except DatabaseError:
+        pass
+
+
+def is_postgresql() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def filter_by_name(queryset: QuerySet, name: str) -> QuerySet:
+    if not is_postgresql():
+        return queryset.filter(name__icontains=name)
+    return queryset.alias(lower_name=Lower("name")).filter(
+        lower_name__contains=name.lower()
+    )
+
+
+def filter_by_tags(queryset: QuerySet, slugs: List[str]) -> QuerySet:
+    return queryset.filter(
+        Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef("pk"),
+                tag_id__in=Tag.objects.filter(slug__in=slugs).values("id"),
+            )
+        )
+    )
+
+
+def rank_by_name_in_two_queries(queryset: QuerySet, name: str) -> List:
+    start_queryset = list(queryset.filter(name__istartswith=name))
+    start_set = set(start_queryset)
+    start_queryset.extend(
+        [
+            obj
+            for obj in queryset.filter(name__icontains=name)
+            if obj not in start_set
+        ]
+    )
+    return start_queryset
+
+
+def rank_by_name(queryset: QuerySet, name: str) -> List or QuerySet:
+    if not is_postgresql():
+        return rank_by_name_in_two_queries(queryset, name)
+
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    name = name.lower()
+    return (
+        filter_by_name(queryset, name)
+        .annotate(
+            is_prefix=ExpressionWrapper(
+                Q(lower_name__startswith=name), output_field=BooleanField()
+            ),
+            similarity=TrigramSimilarity(Lower("name"), name),
+        )
+        .order_by("-is_prefix", "-similarity", "name")
+    )
+
+
+def search_users(queryset: QuerySet, query: str) -> QuerySet:
+    query = query.lower()
+    aliases = {f"lower_{field}": Lower(field) for field in user_search_fields}
+    condition = Q()
+    for alias in aliases:
+        condition |= Q(**{f"{alias}__startswith": query})
+    return queryset.alias(**aliases).filter(condition)
+
+
+def search_ingredients(name: str, limit: int or None = None) -> list:
+    if name[0] == "%":
+        name = unquote(name)
+    else:
+        name = name.translate(layout)
+    name = name.lower()
+
+    if ingredient_search_backend == "database":
+        return rank_by_name(Ingredient.objects.all(), name)[:limit]
+    return get_ingredient_index().search(name, limit)
@@ -1,15 +1,21 @@
 from collections import OrderedDict
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
+from api.relations import get_relations
+from api.subscriptions import get_recipes_limit
+from api.validators import ingredients_validator, tags_exist_validator
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db.models import F
 from django.db.models.query import QuerySet
 from django.db.transaction import atomic
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
-from rest_framework.serializers import (ListSerializer, ModelSerializer,
-                                        SerializerMethodField)
+from recipes.models import (AmountIngredient, Ingredient, Recipe,
+                            ShoppingListItem, Tag)
+from rest_framework.request import Request
+from rest_framework.serializers import (IntegerField, ListField,
+                                        ListSerializer, ModelSerializer,
+                                        Serializer, SerializerMethodField)
 
 if TYPE_CHECKING:
     from recipes.models import Ingredient
@@ -19,27 +25,50 @@ User = get_user_model()
 
 class FilterRecipesLimitSerializer(ListSerializer):
     def to_representation(self, data):
-        if not self.context.get("request"):
+        recipes_limit = get_recipes_limit(self.context.get("request"))
+        if recipes_limit is None:
             return super().to_representation(data)
 
-        if "recipes_limit" not in self.context["request"].query_params:
-            return super().to_representation(data)
-
-        recipes_limit = int(
-            self.context["request"].query_params.get("recipes_limit")
-        )
         return super().to_representation(data.all()[:recipes_limit])
 
 
+def absolute_renditions(recipe: Recipe, request: Request or None) -> dict:
+    if request is None:
+        return recipe.renditions
+    return {
+        rendition: {
+            image_format: request.build_absolute_uri(url)
+            for image_format, url in urls.items()
+        }
+        for rendition, urls in recipe.renditions.items()
+    }
+
+
+class SparseFieldsSerializer(ModelSerializer):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields is None:
+            return
+        for name in list(self.fields):
+            if name not in fields and not self.fields[name].write_only:
+                self.fields.pop(name)
+
+
 class ShortRecipeSerializer(ModelSerializer):
+    renditions = SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = "id", "name", "image", "cooking_time"
+        fields = "id", "name", "image", "renditions", "cooking_time"
         read_only_fields = ("__all__",)
         list_serializer_class = FilterRecipesLimitSerializer
 
+    def get_renditions(self, recipe: Recipe) -> dict:
+        return absolute_renditions(recipe, self.context.get("request"))
+
 
-class UserSerializer(ModelSerializer):
+class UserSerializer(SparseFieldsSerializer):
     is_subscribed = SerializerMethodField()
 
     class Meta:
@@ -57,12 +86,15 @@ class UserSerializer(ModelSerializer):
         read_only_fields = ("is_subscribed",)
 
     def get_is_subscribed(self, obj: User) -> bool:
-        user = self.context.get("view").request.user
+        request = self.context.get("view").request
 
-        if user.is_anonymous or (user == obj):
+        if request.user == obj:
             return False
 
-        return user.subscriptions.filter(author=obj).exists()
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
+        return obj.id in get_relations(request).subscriptions
 
     def create(self, validated_data: dict) -> User:
         user = User(
@@ -75,6 +107,12 @@ class UserSerializer(ModelSerializer):
         user.save()
         return user
 
+    def update(self, instance: User, validated_data: dict) -> User:
+        password = validated_data.pop("password", None)
+        if password is not None:
+            instance.set_password(password)
+        return super().update(instance, validated_data)
+
 
 class SubscribeSerializer(UserSerializer):
     recipes = ShortRecipeSerializer(many=True, read_only=True)
@@ -98,7 +136,16 @@ class SubscribeSerializer(UserSerializer):
         return True
 
     def get_recipes_count(self, obj: User) -> int:
-        return obj.recipes.count()
+        return obj.recipes_count
+
+
+class RecipeIdsSerializer(Serializer):
+    ids = ListField(
+        child=IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
+
+    def validate_ids(self, ids: List[int]) -> List[int]:
+        return list(dict.fromkeys(ids))
 
 
 class TagSerializer(ModelSerializer):
@@ -121,13 +168,14 @@ class IngredientSerializer(ModelSerializer):
         read_only_fields = ("__all__",)
 
 
-class RecipeSerializer(ModelSerializer):
+class RecipeSerializer(SparseFieldsSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = SerializerMethodField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     image = Base64ImageField()
+    renditions = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -140,6 +188,7 @@ class RecipeSerializer(ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "renditions",
             "text",
             "cooking_time",
         )
@@ -148,50 +197,93 @@ class RecipeSerializer(ModelSerializer):
             "is_shopping_cart",
         )
 
-    def create_ingredients_amounts(self, ingredients, recipe):
+    def create_ingredients_amounts(
+        self, ingredients: Dict[int, Tuple[Ingredient, int]], recipe: Recipe
+    ) -> None:
         AmountIngredient.objects.bulk_create(
             [
                 AmountIngredient(
-                    ingredients=Ingredient.objects.get(id=ingredient["id"]),
-                    recipe=recipe,
-                    amount=ingredient["amount"],
+                    ingredients=ingredient, recipe=recipe, amount=amount
                 )
-                for ingredient in ingredients
+                for ingredient, amount in ingredients.values()
             ],
         )
 
-    def get_ingredients(self, recipe: Recipe) -> QuerySet:
-        return recipe.ingredients.values(
-            "id", "name", "measurement_unit", amount=F("recipe__amount")
-        )
+    def update_ingredients_amounts(
+        self, ingredients: Dict[int, Tuple[Ingredient, int]], recipe: Recipe
+    ) -> bool:
+        existing = {
+            amount.ingredients_id: amount for amount in recipe.ingredient.all()
+        }
+        removed = existing.keys() - ingredients.keys()
+        changed = []
+        for ingredient_id, amount in existing.items():
+            if ingredient_id in ingredients:
+                new_amount = ingredients[ingredient_id][1]
+                if amount.amount != new_amount:
+                    amount.amount = new_amount
+                    changed.append(amount)
+
+        if removed:
+            amounts = recipe.ingredient.filter(ingredients_id__in=removed)
+            amounts._raw_delete(amounts.db)
+        if changed:
+            AmountIngredient.objects.bulk_update(changed, ("amount",))
+        added = {
+            ingredient_id: value
+            for ingredient_id, value in ingredients.items()
+            if ingredient_id not in existing
+        }
+        if added:
+            self.create_ingredients_amounts(added, recipe)
+
+        return bool(removed or changed or added)
+
+    def get_ingredients(self, recipe: Recipe) -> List[dict] or QuerySet:
+        if "ingredient" not in getattr(
+            recipe, "_prefetched_objects_cache", {}
+        ):
+            return recipe.ingredients.values(
+                "id", "name", "measurement_unit", amount=F("recipe__amount")
+            )
+
+        return [
+            {
+                "id": amount.ingredients.id,
+                "name": amount.ingredients.name,
+                "measurement_unit": amount.ingredients.measurement_unit,
+                "amount": amount.amount,
+            }
+            for amount in recipe.ingredient.all()
+        ]
 
-    def get_is_favorited(self, recipe: Recipe) -> bool:
-        user = self.context.get("view").request.user
+    def get_renditions(self, recipe: Recipe) -> dict:
+        return absolute_renditions(recipe, self.context.get("request"))
 
-        if user.is_anonymous:
-            return False
-
-        return user.favorites.filter(recipe=recipe).exists()
+    def get_is_favorited(self, recipe: Recipe) -> bool:
+        request = self.context.get("view").request
+        return recipe.id in get_relations(request).favorites
 
     def get_is_in_shopping_cart(self, recipe: Recipe) -> bool:
-        user = self.context.get("view").request.user
-
-        if user.is_anonymous:
-            return False
-
-        return user.carts.filter(recipe=recipe).exists()
+        request = self.context.get("view").request
+        return recipe.id in get_relations(request).carts
 
     def validate(self, data: OrderedDict) -> OrderedDict:
         tags_ids: list[int] = self.initial_data.get("tags")
         ingredients = self.initial_data.get("ingredients")
 
-        if not tags_ids or not ingredients:
+        if not (
+            tags_ids
+            and ingredients
+            and isinstance(tags_ids, list)
+            and isinstance(ingredients, list)
+        ):
             raise ValidationError("Недостаточно данных.")
 
         data.update(
             {
-                "tags": tags_ids,
-                "ingredients": ingredients,
+                "tags": tags_exist_validator(tags_ids, Tag),
+                "ingredients": ingredients_validator(ingredients, Ingredient),
                 "author": self.context.get("request").user,
             }
         )
@@ -199,8 +291,8 @@ class RecipeSerializer(ModelSerializer):
 
     @atomic
     def create(self, validated_data: dict) -> Recipe:
-        tags: list[int] = validated_data.pop("tags")
-        ingredients: dict[int, tuple] = validated_data.pop("ingredients")
+        tags: List[Tag] = validated_data.pop("tags")
+        ingredients: Dict[int, tuple] = validated_data.pop("ingredients")
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients_amounts(ingredients, recipe)
@@ -216,12 +308,14 @@ class RecipeSerializer(ModelSerializer):
                 setattr(recipe, key, value)
 
         if tags:
-            recipe.tags.clear()
             recipe.tags.set(tags)
 
-        if ingredients:
-            recipe.ingredients.clear()
-            self.create_ingredients_amounts(ingredients, recipe)
+        if ingredients and self.update_ingredients_amounts(
+            ingredients, recipe
+        ):
+            ShoppingListItem.objects.rebuild(
+                recipe.in_carts.values_list("user_id", flat=True)
+            )
 
         recipe.save()
         return recipe
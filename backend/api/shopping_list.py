@@ -0,0 +1,71 @@
+import csv
+import json
+from datetime import datetime as dt
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db.models import F, QuerySet
+from recipes.models import ShoppingListItem
+
+date_time_format = settings.DATE_TIME_FORMAT
+shopping_list_chunk_size = settings.SHOPPING_LIST_CHUNK_SIZE
+
+
+def shopping_list(user) -> QuerySet:
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values(
+            "amount",
+            name=F("ingredient__name"),
+            measurement=F("ingredient__measurement_unit"),
+        )
+        .order_by("name", "measurement")
+    )
+
+
+def iter_shopping_list(user) -> Iterator[dict]:
+    return shopping_list(user).iterator(chunk_size=shopping_list_chunk_size)
+
+
+def stream_txt(user, rows: Iterable[dict]) -> Iterator[str]:
+    yield (
+        f"Список покупок для:\n\n{user.first_name}\n"
+        f"{dt.now().strftime(date_time_format)}\n\n"
+    )
+    for ing in rows:
+        yield f'{ing["name"]}: {ing["amount"]} {ing["measurement"]}\n'
+    yield "\nВыгружено из Foodgram"
+
+
+class _Echo:
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(user, rows: Iterable[dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for ing in rows:
+        yield writer.writerow((ing["name"], ing["measurement"], ing["amount"]))
+
+
+def stream_json(user, rows: Iterable[dict]) -> Iterator[str]:
+    separator = "["
+    for ing in rows:
+        yield separator + json.dumps(
+            {
+                "name": ing["name"],
+                "measurement_unit": ing["measurement"],
+                "amount": ing["amount"],
+            },
+            ensure_ascii=False,
+        )
+        separator = ","
+    yield "]" if separator == "," else "[]"
+
+
+export_formats = {
+    "txt": ("text/plain; charset=utf-8", stream_txt),
+    "csv": ("text/csv; charset=utf-8", stream_csv),
+    "json": ("application/json; charset=utf-8", stream_json),
+}
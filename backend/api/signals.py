@@ -0,0 +1,147 @@
+from api.authentication import forget_token
+from api.cache import author_version, bump_version_on_commit
+from api.relations import relations_version
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db.transaction import on_commit
+from django.dispatch import receiver
+from recipes.counters import adjust_counter, counted_id
+from recipes.models import (AmountIngredient, Carts, Favorites, FeedItem,
+                            Ingredient, Recipe, ShoppingListItem, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Subscribe
+
+User = get_user_model()
+
+m2m_actions = "post_add", "post_remove", "post_clear"
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance: Recipe, **kwargs) -> None:
+    bump_version_on_commit("recipes", author_version(instance.author_id))
+
+
+@receiver((post_save, post_delete), sender=AmountIngredient)
+def recipe_ingredient_changed(
+    sender, instance: AmountIngredient, **kwargs
+) -> None:
+    if AmountIngredient.recipe.is_cached(instance):
+        author_id = instance.recipe.author_id
+    else:
+        author_id = (
+            Recipe.objects.filter(id=instance.recipe_id)
+            .values_list("author_id", flat=True)
+            .first()
+        )
+    bump_version_on_commit("recipes", author_version(author_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action: str, **kwargs) -> None:
+    if action not in m2m_actions:
+        return
+    if isinstance(instance, Recipe):
+        bump_version_on_commit("recipes", author_version(instance.author_id))
+    else:
+        bump_version_on_commit("recipes")
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs) -> None:
+    bump_version_on_commit("catalog", "recipes", "tags")
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs) -> None:
+    bump_version_on_commit("catalog", "recipes", "ingredients")
+
+
+@receiver((post_save, post_delete), sender=User)
+def author_changed(sender, instance: User, **kwargs) -> None:
+    if kwargs.get("update_fields") == frozenset(("last_login",)):
+        return
+    bump_version_on_commit("recipes", author_version(instance.id))
+
+
+@receiver(post_save, sender=User)
+def credentials_changed(sender, instance: User, **kwargs) -> None:
+    if kwargs.get("update_fields") == frozenset(("last_login",)):
+        return
+    for key in Token.objects.filter(user_id=instance.id).values_list(
+        "key", flat=True
+    ):
+        on_commit(lambda key=key: forget_token(key))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance: Token, **kwargs) -> None:
+    on_commit(lambda: forget_token(instance.key))
+
+
+@receiver((post_save, post_delete), sender=Favorites)
+@receiver((post_save, post_delete), sender=Carts)
+@receiver((post_save, post_delete), sender=Subscribe)
+def relations_changed(sender, instance, **kwargs) -> None:
+    bump_version_on_commit(relations_version(instance.user_id))
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=Carts)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscribe)
+def counted_created(sender, instance, created: bool, **kwargs) -> None:
+    if created:
+        adjust_counter(sender, (counted_id(instance),), 1)
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=Carts)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscribe)
+def counted_deleted(sender, instance, **kwargs) -> None:
+    adjust_counter(sender, (counted_id(instance),), -1)
+
+
+@receiver(post_save, sender=Carts)
+def cart_added(sender, instance: Carts, created: bool, **kwargs) -> None:
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=Carts)
+def cart_removed(sender, instance: Carts, **kwargs) -> None:
+    ShoppingListItem.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+@receiver((post_save, post_delete), sender=AmountIngredient)
+def cart_amounts_changed(
+    sender, instance: AmountIngredient, **kwargs
+) -> None:
+    ShoppingListItem.objects.rebuild(
+        Carts.objects.filter(recipe_id=instance.recipe_id).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(
+    sender, instance: Recipe, created: bool, **kwargs
+) -> None:
+    if created:
+        on_commit(lambda: FeedItem.objects.fan_out(instance.id))
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribed(sender, instance: Subscribe, created: bool, **kwargs) -> None:
+    if created:
+        FeedItem.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def unsubscribed(sender, instance: Subscribe, **kwargs) -> None:
+    FeedItem.objects.trim(instance.user_id, instance.author_id)
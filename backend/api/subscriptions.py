@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from recipes.models import Recipe
+from rest_framework.request import Request
+
+recipe_card_fields = (
+    "id",
+    "name",
+    "image",
+    "renditions_ready",
+    "cooking_time",
+    "author_id",
+)
+
+
+def get_recipes_limit(request: Request or None) -> int or None:
+    if request is None:
+        return None
+    recipes_limit: str = request.query_params.get("recipes_limit", "")
+    return int(recipes_limit) if recipes_limit.isdigit() else None
+
+
+def ranked_recipes(
+    author_ids: List[int], limit: int, *fields: str
+) -> Tuple[str, tuple]:
+    ranked = Recipe.objects.filter(author_id__in=author_ids).annotate(
+        recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=(F("author_id"),),
+            order_by=(F("pub_date").desc(), F("id").desc()),
+        )
+    )
+    if fields:
+        ranked = ranked.values(*fields, "recipe_rank")
+    sql, params = ranked.order_by().query.sql_with_params()
+    return (
+        f"SELECT {', '.join(fields) or '*'} FROM ({sql}) ranked "
+        "WHERE recipe_rank <= %s ORDER BY author_id, recipe_rank",
+        (*params, limit),
+    )
+
+
+def latest_recipes(author_ids: List[int], limit: int or None) -> List[Recipe]:
+    if not author_ids:
+        return []
+    if limit is None:
+        return list(
+            Recipe.objects.filter(author_id__in=author_ids).order_by(
+                "author_id", "-pub_date", "-id"
+            )
+        )
+    return list(Recipe.objects.raw(*ranked_recipes(author_ids, limit)))
+
+
+def latest_recipe_rows(
+    author_ids: List[int], limit: int or None
+) -> List[dict]:
+    if not author_ids:
+        return []
+    if limit is None:
+        return list(
+            Recipe.objects.filter(author_id__in=author_ids)
+            .order_by("author_id", "-pub_date", "-id")
+            .values(*recipe_card_fields)
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            *ranked_recipes(author_ids, limit, *recipe_card_fields)
+        )
+        return [dict(zip(recipe_card_fields, row)) for row in cursor]
+
+
+def attach_latest_recipes(authors: Iterable, limit: int or None) -> None:
+    authors = list(authors)
+    recipes = defaultdict(list)
+    for recipe in latest_recipes([author.id for author in authors], limit):
+        recipes[recipe.author_id].append(recipe)
+
+    for author in authors:
+        queryset = author.recipes.all()
+        queryset._result_cache = recipes[author.id]
+        queryset._prefetch_done = True
+        author._prefetched_objects_cache = {"recipes": queryset}
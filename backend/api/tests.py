@@ -0,0 +1,489 @@
+from unittest import mock, skipIf
+
+from api.authentication import (CachedTokenAuthentication, forget_token,
+                                local_tokens, token_cache_key)
+from api.renderers import FastJSONRenderer, orjson
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from recipes.models import (AmountIngredient, Carts, Favorites, Ingredient,
+                            Recipe, ShoppingListItem, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+class RecipesAPITestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.author = User.objects.create(
+            username="author", email="author@example.com"
+        )
+        cls.reader = User.objects.create(
+            username="reader", email="reader@example.com"
+        )
+        cls.tags = [
+            Tag.objects.create(
+                name=f"тег{i}", color=f"#00000{i}", slug=f"tag{i}"
+            )
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"ингредиент{i}", measurement_unit="г"
+            )
+            for i in range(10)
+        ]
+        for i in range(25):
+            recipe = Recipe.objects.create(
+                author=cls.author if i % 2 else cls.reader,
+                name=f"рецепт{i}",
+                text="текст",
+                cooking_time=5,
+                image=f"recipe_images/{i:02}/{i:064}.png",
+            )
+            recipe.tags.set(cls.tags[: i % 3 + 1])
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(
+                    recipe=recipe, ingredients=ingredient, amount=i + 1
+                )
+                for ingredient in cls.ingredients[i % 5:i % 5 + 4]
+            )
+            if i % 3 == 0:
+                Favorites.objects.create(user=cls.reader, recipe=recipe)
+            if i % 4 == 0:
+                Carts.objects.create(user=cls.reader, recipe=recipe)
+        Subscribe.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client.force_authenticate(self.reader)
+
+
+class RecipeListQueriesTest(RecipesAPITestCase):
+    def test_list_query_count_does_not_depend_on_page_size(self) -> None:
+        for limit in (2, 20):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(7):
+                    response = self.client.get(f"/api/recipes/?limit={limit}")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data["results"]), limit)
+
+    def test_retrieve_query_count(self) -> None:
+        recipe = Recipe.objects.first()
+        with self.assertNumQueries(7):
+            response = self.client.get(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(response.status_code, 200)
+
+
+class ManagedFieldsTest(RecipesAPITestCase):
+    def test_save_keeps_counters_updated_elsewhere(self) -> None:
+        author = User.objects.get(id=self.author.id)
+        recipe = Recipe.objects.filter(author=author).first()
+        Subscribe.objects.filter(author=author).delete()
+        Favorites.objects.filter(recipe=recipe).delete()
+        Favorites.objects.create(user=self.author, recipe=recipe)
+
+        author.set_password("новый-пароль")
+        author.save()
+        recipe.name = "переименованный"
+        recipe.save()
+
+        author.refresh_from_db()
+        recipe.refresh_from_db()
+        self.assertEqual(author.subscribers_count, 0)
+        self.assertEqual(author.recipes_count, 12)
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.name, "переименованный")
+
+    def test_save_keeps_renditions_ready_set_in_background(self) -> None:
+        recipe = Recipe.objects.first()
+        Recipe.objects.filter(id=recipe.id).update(renditions_ready=True)
+        recipe.name = "переименованный"
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.renditions_ready)
+
+        recipe.image = "recipe_images/другое.png"
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.renditions_ready)
+
+
+class FastSerializersTest(RecipesAPITestCase):
+    urls = (
+        "/api/recipes/",
+        "/api/recipes/?limit=20&page=2",
+        "/api/recipes/?tags=tag1&tags=tag2",
+        "/api/recipes/?is_favorited=1",
+        "/api/recipes/?is_in_shopping_cart=1",
+        "/api/recipes/?author={author}",
+        "/api/recipes/?fields=id,name,author,is_favorited",
+        "/api/recipes/?omit=ingredients,text",
+        "/api/recipes/{recipe}/",
+        "/api/tags/",
+        "/api/tags/{tag}/",
+        "/api/ingredients/",
+        "/api/ingredients/?name=ингредиент1",
+        "/api/ingredients/{ingredient}/",
+    )
+    subscription_urls = (
+        "/api/users/subscriptions/?limit=6",
+        "/api/users/subscriptions/?limit=6&recipes_limit=2",
+        "/api/users/subscriptions/?limit=6&fields=id,recipes_count",
+    )
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        orphan = Recipe.objects.create(
+            author=None,
+            name="рецепт без автора",
+            text="текст",
+            cooking_time=5,
+            image="recipe_images/orphan.png",
+        )
+        orphan.tags.set(cls.tags)
+        Favorites.objects.create(user=cls.reader, recipe=orphan)
+        Carts.objects.create(user=cls.reader, recipe=orphan)
+
+    def get_json(self, url: str, fast: bool) -> dict or list:
+        cache.clear()
+        with override_settings(FAST_READ_SERIALIZERS=fast):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assert_same_output(self, urls: tuple) -> None:
+        ids = {
+            "author": self.author.id,
+            "recipe": Recipe.objects.first().id,
+            "tag": self.tags[0].id,
+            "ingredient": self.ingredients[0].id,
+        }
+        for url in urls:
+            url = url.format(**ids)
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.get_json(url, fast=True),
+                    self.get_json(url, fast=False),
+                )
+
+    def test_anonymous(self) -> None:
+        self.client.force_authenticate(None)
+        self.assert_same_output(self.urls)
+
+    def test_authenticated(self) -> None:
+        for user in (self.reader, self.author):
+            self.client.force_authenticate(user)
+            self.assert_same_output(self.urls + self.subscription_urls)
+
+
+class SubscribeTest(RecipesAPITestCase):
+    def test_subscribe_returns_author_recipes(self) -> None:
+        self.client.force_authenticate(self.author)
+        response = self.client.post(f"/api/users/{self.reader.id}/subscribe/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["recipes_count"], 13)
+        self.assertEqual(len(response.data["recipes"]), 13)
+        self.assertTrue(response.data["is_subscribed"])
+
+
+class TokenAuthenticationTest(RecipesAPITestCase):
+    def test_cached_user_has_no_counters_or_password(self) -> None:
+        self.author.set_password("пароль")
+        self.author.save()
+        token = Token.objects.create(user=self.author)
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(token.key)
+        user, _ = authentication.authenticate_credentials(token.key)
+        self.assertTrue(set(User.counter_fields) <= user.get_deferred_fields())
+        self.assertIn("password", user.get_deferred_fields())
+        self.assertNotIn(
+            self.author.password.encode(),
+            cache.get(token_cache_key(token.key)),
+        )
+        self.assertEqual(user.recipes_count, 12)
+
+    def test_logout_during_load_wins(self) -> None:
+        token = Token.objects.create(user=self.author)
+        authentication = CachedTokenAuthentication()
+        load_credentials = authentication.load_credentials
+
+        def racing_load_credentials(key):
+            credentials = load_credentials(key)
+            forget_token(key)
+            return credentials
+
+        authentication.load_credentials = racing_load_credentials
+        authentication.authenticate_credentials(token.key)
+        self.assertIsNone(cache.get(token_cache_key(token.key)))
+        self.assertIsNone(local_tokens.get(token_cache_key(token.key)))
+
+
+class UserPermissionsTest(RecipesAPITestCase):
+    def test_users_cannot_edit_profiles(self) -> None:
+        for url in ("/api/users/me/", f"/api/users/{self.reader.id}/"):
+            with self.subTest(url=url):
+                response = self.client.patch(url, {"first_name": "имя"})
+                self.assertEqual(response.status_code, 403)
+
+    def test_staff_password_change_is_hashed(self) -> None:
+        self.client.force_authenticate(
+            User.objects.create(
+                username="admin", email="admin@example.com", is_staff=True
+            )
+        )
+        response = self.client.patch(
+            f"/api/users/{self.reader.id}/", {"password": "новый-пароль"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.reader.refresh_from_db()
+        self.assertTrue(self.reader.check_password("новый-пароль"))
+
+
+class CursorPaginationTest(RecipesAPITestCase):
+    def test_cursor_pages_through_recipes_sharing_pub_date(self) -> None:
+        Recipe.objects.update(pub_date=timezone.now())
+        expected = list(
+            Recipe.objects.order_by("-pub_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        seen = []
+        url = "/api/recipes/?cursor=&limit=4&fields=id"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [recipe["id"] for recipe in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, expected)
+
+    def test_cursor_previous_link_returns_to_previous_page(self) -> None:
+        Recipe.objects.update(pub_date=timezone.now())
+        first = self.client.get("/api/recipes/?cursor=&limit=4&fields=id")
+        second = self.client.get(first.data["next"])
+        previous = self.client.get(second.data["previous"])
+        self.assertEqual(previous.data["results"], first.data["results"])
+        self.assertNotEqual(second.data["results"], first.data["results"])
+
+
+class ConditionalGetTest(RecipesAPITestCase):
+    def assert_not_modified_until(self, url: str, write) -> None:
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_writes_invalidate_etag(self) -> None:
+        recipe = Recipe.objects.filter(tags=self.tags[0]).first()
+        ingredient = recipe.ingredients.first()
+        writes = {
+            "recipe": lambda: Recipe.objects.get(id=recipe.id).save(),
+            "tag": lambda: Tag.objects.get(id=self.tags[0].id).save(),
+            "ingredient": lambda: Ingredient.objects.get(
+                id=ingredient.id
+            ).save(),
+        }
+        for name, write in writes.items():
+            for url in ("/api/recipes/?limit=5", f"/api/recipes/{recipe.id}/"):
+                with self.subTest(write=name, url=url):
+                    self.assert_not_modified_until(url, write)
+
+    def test_bad_pk_is_not_found(self) -> None:
+        for user in (None, self.reader):
+            self.client.force_authenticate(user)
+            for pk in ("abc", "0"):
+                with self.subTest(user=user, pk=pk):
+                    response = self.client.get(f"/api/recipes/{pk}/")
+                    self.assertEqual(response.status_code, 404)
+
+
+class ShoppingListUpkeepTest(RecipesAPITestCase):
+    def assert_lists_match_carts(self) -> None:
+        expected = {
+            (row["user_id"], row["ingredients_id"]): row["total"]
+            for row in ShoppingListItem.objects.expected()
+        }
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                ShoppingListItem.objects.values_list(
+                    "user_id", "ingredient_id", "amount"
+                )
+            )
+        }
+        self.assertEqual(stored, expected)
+
+    def test_lists_follow_writes_outside_the_api(self) -> None:
+        recipe = Carts.objects.filter(user=self.reader).first().recipe
+        Carts.objects.create(
+            user=self.author, recipe=Recipe.objects.exclude(id=recipe.id)[0]
+        )
+        amount = AmountIngredient.objects.filter(recipe=recipe).first()
+        amount.amount += 10
+        writes = {
+            "cart added": lambda: Carts.objects.create(
+                user=self.author, recipe=recipe
+            ),
+            "amount edited": lambda: amount.save(),
+            "amount added": lambda: AmountIngredient.objects.create(
+                recipe=recipe, ingredients=self.ingredients[9], amount=7
+            ),
+            "amount deleted": lambda: AmountIngredient.objects.get(
+                id=amount.id
+            ).delete(),
+            "cart deleted": lambda: Carts.objects.filter(
+                user=self.reader
+            ).first().delete(),
+            "ingredient deleted": lambda: self.ingredients[2].delete(),
+            "recipe deleted": lambda: recipe.delete(),
+            "user deleted": lambda: User.objects.get(
+                id=self.author.id
+            ).delete(),
+        }
+        self.assert_lists_match_carts()
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                write()
+                self.assertTrue(ShoppingListItem.objects.exists())
+                self.assert_lists_match_carts()
+
+
+class BulkAddDelTest(RecipesAPITestCase):
+    def test_counter_skips_rows_inserted_concurrently(self) -> None:
+        recipes = list(
+            Recipe.objects.exclude(in_favorites__user=self.reader)[:3]
+        )
+        bulk_create = Favorites.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            Favorites.objects.create(user=self.reader, recipe=recipes[0])
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(
+            Favorites.objects, "bulk_create", racing_bulk_create
+        ):
+            response = self.client.post(
+                "/api/recipes/favorite/",
+                {"ids": [recipe.id for recipe in recipes]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["status"] for row in response.data],
+            ["already_added", "added", "added"],
+        )
+        for recipe in recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.favorites_count, 1)
+
+
+class AddDelTest(RecipesAPITestCase):
+    def test_add_and_delete_favorite(self) -> None:
+        recipe = Recipe.objects.exclude(in_favorites__user=self.reader)[0]
+        url = f"/api/recipes/{recipe.id}/favorite/"
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+
+    def test_bad_id_is_not_found(self) -> None:
+        for url in (
+            "/api/recipes/abc/favorite/",
+            "/api/recipes/0/shopping_cart/",
+            "/api/users/abc/subscribe/",
+        ):
+            for method in (self.client.post, self.client.delete):
+                with self.subTest(url=url, method=method.__name__):
+                    self.assertEqual(method(url).status_code, 404)
+
+
+@skipIf(orjson is None, "orjson не установлен")
+class RenderersTest(SimpleTestCase):
+    def test_orjson_matches_stdlib_on_datetimes(self) -> None:
+        now = timezone.now().replace(microsecond=123456)
+        data = {
+            "count": 1,
+            "next": None,
+            "results": [
+                {
+                    "id": 1,
+                    "name": "рецепт\u2028",
+                    "pub_date": now,
+                    "naive": now.replace(tzinfo=None),
+                    "moscow": now.astimezone(timezone.get_fixed_timezone(180)),
+                    "date": now.date(),
+                    "time": now.time(),
+                    "cooking_time": 5,
+                }
+            ],
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+
+class RecipeUpdateQueriesTest(RecipesAPITestCase):
+    def patch_ingredients(self, changes: int) -> None:
+        kept = [
+            Ingredient.objects.create(
+                name=f"есть{changes}-{i}", measurement_unit="г"
+            )
+            for i in range(20)
+        ]
+        new = [
+            Ingredient.objects.create(
+                name=f"новый{changes}-{i}", measurement_unit="г"
+            )
+            for i in range(changes)
+        ]
+        recipe = Recipe.objects.create(
+            author=self.author,
+            name=f"правка{changes}",
+            text="текст",
+            cooking_time=5,
+            image="recipe_images/правка.png",
+        )
+        recipe.tags.set(self.tags[:1])
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=recipe, ingredients=ingredient, amount=1)
+            for ingredient in kept
+        )
+        Carts.objects.create(user=self.reader, recipe=recipe)
+        ingredients = [
+            {"id": ingredient.id, "amount": 2 if i < changes else 1}
+            for i, ingredient in enumerate(kept[changes:])
+        ] + [{"id": ingredient.id, "amount": 3} for ingredient in new]
+
+        self.client.force_authenticate(self.author)
+        cache.clear()
+        with self.assertNumQueries(24):
+            response = self.client.patch(
+                f"/api/recipes/{recipe.id}/",
+                {"tags": [self.tags[0].id], "ingredients": ingredients},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(
+                recipe.ingredient.values_list("ingredients_id", "amount")
+            ),
+            sorted((row["id"], row["amount"]) for row in ingredients),
+        )
+
+    def test_update_query_count_does_not_depend_on_changes(self) -> None:
+        for changes in (2, 10):
+            with self.subTest(changes=changes):
+                self.patch_ingredients(changes)
@@ -1,6 +1,6 @@
 from re import compile
 from string import hexdigits
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple, Type
 
 from django.core.exceptions import ValidationError
 from django.utils.deconstruct import deconstructible
@@ -77,36 +77,48 @@ def hex_color_validator(color: str) -> str:
     return "#" + color.upper()
 
 
-def tags_exist_validator(tags_ids: List[int or str], tag: "Tag") -> None:
-    exists_tags = Tag.objects.filter(id__in=tags_ids)
+def tags_exist_validator(
+    tags_ids: List[int or str], tag: Type["Tag"]
+) -> List["Tag"]:
+    try:
+        tags_ids = list(dict.fromkeys(int(tag_id) for tag_id in tags_ids))
+    except (TypeError, ValueError):
+        raise ValidationError("Указанный тег не существует.")
 
+    exists_tags = tag.objects.in_bulk(tags_ids)
     if len(exists_tags) != len(tags_ids):
         raise ValidationError("Указанный тег не существует.")
 
+    return [exists_tags[tag_id] for tag_id in tags_ids]
+
 
 def ingredients_validator(
     ingredients: List[Dict[str, str or int]],
-    ingredient: "Ingredient",
+    ingredient: Type["Ingredient"],
 ) -> Dict[int, Tuple["Ingredient", int]]:
     valid_ings = {}
 
     for ing in ingredients:
-        if not (isinstance(ing["amount"], int) or ing["amount"].isdigit()):
+        try:
+            ing_id, amount = int(ing["id"]), ing["amount"]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError("Что-то не то с ингредиентами.")
+
+        if not str(amount).isdigit():
             raise ValidationError(
                 "Указано неправильное количество ингредиента"
             )
 
-        amount = valid_ings.get(ing["id"], 0) + int(ing["amount"])
-        valid_ings[ing["id"]] = amount
+        valid_ings[ing_id] = valid_ings.get(ing_id, 0) + int(amount)
 
     if not valid_ings:
         raise ValidationError("Что-то не то с ингредиентами.")
 
-    db_ings = Ingredient.objects.filter(pk__in=valid_ings.keys())
-    if not db_ings:
+    db_ings = ingredient.objects.in_bulk(valid_ings.keys())
+    if len(db_ings) != len(valid_ings):
         raise ValidationError("Что-то не то с ингредиентами.")
 
-    for ing in db_ings:
-        valid_ings[ing.pk] = (ing, valid_ings[ing.pk])
-
-    return valid_ings
+    return {
+        ing_id: (db_ings[ing_id], amount)
+        for ing_id, amount in valid_ings.items()
+    }
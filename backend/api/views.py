@@ -1,31 +1,44 @@
-from datetime import datetime as dt
+from itertools import chain
 from typing import List
-from urllib.parse import unquote
-
-from api.mixins import AddDelViewMixin
-from api.paginators import PageLimitPagination
-from api.permissions import OwnerOrReadOnly
-from api.serializers import (IngredientSerializer, RecipeSerializer,
-                             ShortRecipeSerializer, SubscribeSerializer,
-                             TagSerializer)
+
+from api.cache import author_version, bump_version_on_commit, get_versions
+from api.fast_serializers import (FastIngredientSerializer,
+                                  FastRecipeSerializer,
+                                  FastSubscribeSerializer, FastTagSerializer)
+from api.mixins import (AddDelViewMixin, CachedResponseMixin,
+                        ConditionalGetMixin, FastReadMixin, SparseFieldsMixin)
+from api.paginators import FeedPagination, PageLimitPagination
+from api.permissions import AdminOrReadOnly, OwnerOrReadOnly
+from api.relations import relations_version
+from api.renderers import CSVRenderer, PlainTextRenderer
+from api.search import (filter_by_name, filter_by_tags, search_ingredients,
+                        search_users)
+from api.serializers import (IngredientSerializer, RecipeIdsSerializer,
+                             RecipeSerializer, ShortRecipeSerializer,
+                             SubscribeSerializer, TagSerializer,
+                             UserSerializer)
+from api.shopping_list import export_formats, iter_shopping_list
+from api.subscriptions import attach_latest_recipes, get_recipes_limit
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import F, Q, QuerySet, Sum
-from django.http.response import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db.models import Exists, F, OuterRef, Prefetch, QuerySet
+from django.db.transaction import atomic
+from django.http.response import StreamingHttpResponse
 from djoser.views import UserViewSet as DjoserUserViewSet
-from recipes.models import Carts, Favorites, Ingredient, Recipe, Tag
+from recipes.counters import adjust_counter
+from recipes.models import (AmountIngredient, Carts, Favorites, FeedItem,
+                            Ingredient, Recipe, ShoppingListItem, Tag)
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.routers import APIRootView
 from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from users.models import Subscribe
 
-date_time_format = settings.DATE_TIME_FORMAT
 action_methods = settings.ACTION_METHODS
 symbol_true_search = settings.SYMBOL_TRUE_SEARCH
 symbol_false_search = settings.SYMBOL_FALSE_SEARCH
@@ -37,87 +50,202 @@ class BaseAPIRootView(APIRootView):
     """API"""
 
 
-class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
+class UserViewSet(SparseFieldsMixin, DjoserUserViewSet, AddDelViewMixin):
     pagination_class = PageLimitPagination
     add_serializer = SubscribeSerializer
-    permission_classes = (DjangoModelPermissions,)
+    permission_classes = (AdminOrReadOnly,)
+    cursor_ordering = None
+    sparse_fields = UserSerializer.Meta.fields
+    sparse_actions = ("list", "retrieve", "me", "subscriptions")
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return queryset
+
+        search = self.request.query_params.get("search", "").strip()
+        if self.action == "list" and search:
+            queryset = search_users(queryset, search)
+
+        if (
+            not self.request.user.is_anonymous
+            and "is_subscribed" in self.get_sparse_fields()
+        ):
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Subscribe.objects.filter(
+                        user_id=self.request.user.id, author=OuterRef("pk")
+                    )
+                )
+            )
+        return queryset
 
     @action(
         methods=action_methods,
         detail=True,
         permission_classes=(IsAuthenticated,),
+        sparse_fields=SubscribeSerializer.Meta.fields,
     )
     def subscribe(self, request: WSGIRequest, id: int or str) -> Response:
-        return self._add_del_obj(id, Subscribe, Q(author__id=id))
+        return self._add_del_obj(
+            id,
+            Subscribe,
+            "author",
+            add_error="Вы уже подписаны на этого автора!",
+            del_error="Вы не подписаны на этого автора!",
+        )
 
-    @action(methods=("get",), detail=False)
+    @action(
+        methods=("get",),
+        detail=False,
+        cursor_ordering=("-date_added", "-id"),
+        sparse_fields=SubscribeSerializer.Meta.fields,
+    )
     def subscriptions(self, request: WSGIRequest) -> Response:
         if self.request.user.is_anonymous:
             return Response(status=HTTP_401_UNAUTHORIZED)
         context = self.get_serializer_context()
         pages = self.paginate_queryset(
-            User.objects.filter(subscribers__user=self.request.user)
+            User.objects.filter(subscribers__user=self.request.user).annotate(
+                date_added=F("subscribers__date_added")
+            )
         )
-        serializer = SubscribeSerializer(pages, many=True, context=context)
+        if settings.FAST_READ_SERIALIZERS:
+            serializer = FastSubscribeSerializer(
+                pages, many=True, context=context
+            )
+        else:
+            if "recipes" in context["fields"]:
+                attach_latest_recipes(pages, get_recipes_limit(self.request))
+            serializer = SubscribeSerializer(
+                pages, many=True, context=context
+            )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ConditionalGetMixin, FastReadMixin, ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    fast_serializer_class = FastIngredientSerializer
+    condition_versions = ("ingredients",)
 
     def get_queryset(self) -> List[Ingredient]:
         name: str = self.request.query_params.get("name")
         if name:
-            if name[0] == "%":
-                name = unquote(name)
-            else:
-                name = name.translate(
-                    str.maketrans(
-                        "qwertyuiop[]asdfghjkl;'zxcvbnm,./",
-                        "йцукенгшщзхъфывапролджэячсмитьбю.",
-                    )
-                )
-            name = name.lower()
-            start_queryset = list(self.queryset.filter(name__istartswith=name))
-            ingridients_set = set(start_queryset)
-            cont_queryset = self.queryset.filter(name__icontains=name)
-            start_queryset.extend(
-                [ing for ing in cont_queryset if ing not in ingridients_set]
+            limit: str = self.request.query_params.get("limit", "")
+            return search_ingredients(
+                name, int(limit) if limit.isdigit() else None
             )
-            return start_queryset
 
-        return self.queryset
+        return self.fast_values(self.queryset)
 
 
 class TagViewSet(
-    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    ConditionalGetMixin,
+    FastReadMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    fast_serializer_class = FastTagSerializer
+    condition_versions = ("tags",)
 
+    def get_queryset(self) -> QuerySet[Tag]:
+        return self.fast_values(super().get_queryset())
 
-class RecipeViewSet(ModelViewSet, AddDelViewMixin):
+
+class RecipeViewSet(
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SparseFieldsMixin,
+    FastReadMixin,
+    ModelViewSet,
+    AddDelViewMixin,
+):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    fast_serializer_class = FastRecipeSerializer
     permission_classes = (OwnerOrReadOnly,)
     pagination_class = PageLimitPagination
     add_serializer = ShortRecipeSerializer
+    cursor_ordering = ("-pub_date", "-id")
+    cache_prefix = "recipes"
+    cache_params = (
+        "tags",
+        "author",
+        "name",
+        "page",
+        "limit",
+        "cursor",
+        "fields",
+        "omit",
+    )
+    sparse_fields = RecipeSerializer.Meta.fields
+    sparse_actions = ("list", "retrieve", "feed")
+    condition_per_user = True
+
+    updated_at = None
+
+    def get_list_versions(self) -> List[str]:
+        author: str = self.request.query_params.get("author", "")
+        if author.isdigit():
+            return ["catalog", author_version(int(author))]
+        return ["recipes"]
+
+    def get_cache_versions(self) -> tuple:
+        if self.action == "list":
+            return get_versions(*self.get_list_versions())
+        return get_versions("recipes")
+
+    def get_condition_versions(self) -> List[str] or None:
+        if self.action == "list":
+            return self.get_list_versions()
+
+        try:
+            recipe = (
+                Recipe.objects.filter(pk=self.kwargs.get("pk"))
+                .values("updated_at", "author_id")
+                .first()
+            )
+        except (TypeError, ValueError):
+            return None
+        if recipe is None:
+            return None
+        self.updated_at = recipe["updated_at"]
+        return ["catalog", author_version(recipe["author_id"])]
+
+    def get_last_modified(self) -> int or None:
+        if self.updated_at is None:
+            return None
+        return int(self.updated_at.timestamp())
 
     def get_queryset(self) -> QuerySet[Recipe]:
         queryset = self.queryset
+        if not self.use_fast_serializer():
+            queryset = self.with_related(queryset)
 
         tags: list = self.request.query_params.getlist("tags")
         if tags:
-            queryset = queryset.filter(tags__slug__in=tags).distinct()
+            queryset = filter_by_tags(queryset, tags)
 
         author: str = self.request.query_params.get("author")
         if author:
             queryset = queryset.filter(author=author)
 
-        if self.request.user.is_anonymous:
-            return queryset
+        name: str = self.request.query_params.get("name")
+        if name:
+            queryset = filter_by_name(queryset, name)
+
+        if not self.request.user.is_anonymous:
+            queryset = self.filter_relations(queryset)
 
+        return self.fast_values(queryset)
+
+    def filter_relations(self, queryset: QuerySet[Recipe]) -> QuerySet[Recipe]:
         is_in_cart: str = self.request.query_params.get("is_in_shopping_cart")
         if is_in_cart in symbol_true_search:
             queryset = queryset.filter(in_carts__user=self.request.user)
@@ -131,37 +259,120 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
             queryset = queryset.exclude(in_favorites__user=self.request.user)
         return queryset
 
-    def add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
-            return Response(
-                {"errors": "Рецепт уже был добавлен!"},
-                status=status.HTTP_400_BAD_REQUEST,
+    def with_related(self, queryset: QuerySet[Recipe]) -> QuerySet[Recipe]:
+        fields = self.get_sparse_fields()
+        if "author" in fields:
+            queryset = queryset.select_related("author")
+        if "tags" in fields:
+            queryset = queryset.prefetch_related("tags")
+        if "ingredients" in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "ingredient",
+                    queryset=AmountIngredient.objects.select_related(
+                        "ingredients"
+                    ).order_by("ingredients__name"),
+                )
+            )
+        if "text" not in fields:
+            queryset = queryset.defer("text")
+        return queryset
+
+    def bulk_add_del(self, model, request: WSGIRequest) -> Response:
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids: List[int] = serializer.validated_data["ids"]
+        user = request.user
+
+        found = set(
+            Recipe.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        added = set(
+            model.objects.filter(user=user, recipe_id__in=found).values_list(
+                "recipe_id", flat=True
             )
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
-        serializer = ShortRecipeSerializer(recipe)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-    def delete_from(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        )
+
+        if request.method == "POST":
+            changed = found - added
+            outcomes = {True: "added", False: "already_added"}
+        else:
+            changed = found & added
+            outcomes = {True: "removed", False: "not_in_list"}
+
+        if changed:
+            with atomic():
+                if request.method == "POST":
+                    changed = self.bulk_add(model, user, changed)
+                    adjust_counter(model, changed, 1)
+                    if model is Carts:
+                        ShoppingListItem.objects.rebuild((user.id,))
+                else:
+                    model.objects.filter(
+                        user=user, recipe_id__in=changed
+                    ).delete()
+                bump_version_on_commit(relations_version(user.id))
+
         return Response(
-            {"errors": "Рецепт уже удален!"},
-            status=status.HTTP_400_BAD_REQUEST,
+            [
+                {
+                    "id": pk,
+                    "status": (
+                        outcomes[pk in changed] if pk in found else "not_found"
+                    ),
+                }
+                for pk in ids
+            ],
+            status=status.HTTP_200_OK,
         )
 
+    def bulk_add(self, model, user: User, ids: set) -> set:
+        objs = model.objects.bulk_create(
+            [model(user=user, recipe_id=pk) for pk in ids],
+            ignore_conflicts=True,
+        )
+        stamps = {obj.recipe_id: obj.date_added for obj in objs}
+        return {
+            recipe_id
+            for recipe_id, date_added in model.objects.filter(
+                user=user, recipe_id__in=ids
+            ).values_list("recipe_id", "date_added")
+            if stamps[recipe_id] == date_added
+        }
+
+    @action(
+        methods=("post", "delete"),
+        detail=False,
+        url_path="favorite",
+        url_name="favorite-bulk",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_bulk(self, request: WSGIRequest) -> Response:
+        return self.bulk_add_del(Favorites, request)
+
+    @action(
+        methods=("post", "delete"),
+        detail=False,
+        url_path="shopping_cart",
+        url_name="shopping-cart-bulk",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request: WSGIRequest) -> Response:
+        return self.bulk_add_del(Carts, request)
+
     @action(
         methods=action_methods,
         detail=True,
         permission_classes=(IsAuthenticated,),
     )
     def favorite(self, request: WSGIRequest, pk: int or str) -> Response:
-        if request.method == "POST":
-            return self.add_to(Favorites, request.user, pk)
-        else:
-            return self.delete_from(Favorites, request.user, pk)
+        return self._add_del_obj(
+            pk,
+            Favorites,
+            "recipe",
+            add_error="Рецепт уже был добавлен!",
+            del_error="Рецепт уже удален!",
+        )
 
     @action(
         methods=action_methods,
@@ -169,37 +380,48 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
         permission_classes=(IsAuthenticated,),
     )
     def shopping_cart(self, request: WSGIRequest, pk: int or str) -> Response:
-        if request.method == "POST":
-            return self.add_to(Carts, request.user, pk)
-        else:
-            return self.delete_from(Carts, request.user, pk)
+        return self._add_del_obj(
+            pk,
+            Carts,
+            "recipe",
+            add_error="Рецепт уже был добавлен!",
+            del_error="Рецепт уже удален!",
+        )
 
-    @action(methods=("get",), detail=False)
+    @action(
+        methods=("get",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request: WSGIRequest) -> Response:
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_queryset(
+            FeedItem.objects.all(), request, self
+        )
+        recipes = self.with_related(Recipe.objects.all()).in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        methods=("get",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
+    )
     def download_shopping_cart(self, request: WSGIRequest) -> Response:
         user = self.request.user
-        if not user.carts.exists():
+        rows = iter_shopping_list(user)
+        first = next(rows, None)
+        if first is None:
             return Response(status=HTTP_400_BAD_REQUEST)
 
-        filename = f"{user.username}_shopping_list.txt"
-        shopping_list = [
-            f"Список покупок для:\n\n{user.first_name}\n"
-            f"{dt.now().strftime(date_time_format)}\n"
-        ]
-
-        ingredients = (
-            Ingredient.objects.filter(recipe__recipe__in_carts__user=user)
-            .values("name", measurement=F("measurement_unit"))
-            .annotate(amount=Sum("recipe__amount"))
-        )
-
-        for ing in ingredients:
-            shopping_list.append(
-                f'{ing["name"]}: {ing["amount"]} {ing["measurement"]}'
-            )
-        shopping_list.append("\nВыгружено из Foodgram")
-        shopping_list = "\n".join(shopping_list)
-        response = HttpResponse(
-            shopping_list, content_type="text.txt; charset=utf-8"
+        export_format = request.accepted_renderer.format
+        content_type, stream = export_formats[export_format]
+        filename = f"{user.username}_shopping_list.{export_format}"
+        response = StreamingHttpResponse(
+            stream(user, chain((first,), rows)), content_type=content_type
         )
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
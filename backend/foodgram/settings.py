@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -81,6 +82,24 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="foodgram"),
+    }
+}
+
+INGREDIENT_SEARCH_BACKEND = os.getenv(
+    "INGREDIENT_SEARCH_BACKEND", default="memory"
+)
+
+FAST_READ_SERIALIZERS = (
+    os.getenv("FAST_READ_SERIALIZERS", default="True") == "True"
+)
+
 AUTH_USER_MODEL = "users.User"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -109,9 +128,22 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static/admin")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+MSGPACK_ENABLED = find_spec("msgpack") is not None
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        *(["api.renderers.MessagePackRenderer"] if MSGPACK_ENABLED else []),
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        *(["api.parsers.MessagePackParser"] if MSGPACK_ENABLED else []),
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -161,13 +193,27 @@ MAX_COOK_TIME = 300
 MIN_AMOUNT_INGREDIENTS = 1
 MAX_AMOUNT_INGREDIENTS = 100
 PAGE_SIZE = 8
-RECIPE_IMAGE_SIZE = 500, 300
+RECIPE_IMAGE_RENDITIONS = {
+    "thumbnail": (250, 150),
+    "hero": (500, 300),
+}
+RECIPE_IMAGE_FORMATS = "webp", "jpeg"
+IMAGE_WORKERS = 2
 ADD_METHODS = "GET", "POST"
 DEL_METHODS = "DELETE"
 ACTION_METHODS = "GET", "POST", "DELETE"
 SYMBOL_TRUE_SEARCH = "1", "true"
 SYMBOL_FALSE_SEARCH = "0", "false"
 EXTRA = 1
+RESPONSE_CACHE_TIMEOUT = 60 * 15
+RELATIONS_CACHE_TIMEOUT = 60 * 15
+TOKEN_CACHE_TIMEOUT = 60 * 15
+TOKEN_LOCAL_CACHE_TIMEOUT = 5
+TOKEN_LOCAL_CACHE_SIZE = 1024
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 DATE_TIME_FORMAT = "%d/%m/%Y %H:%M"
+SHOPPING_LIST_CHUNK_SIZE = 500
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_CELEBRITY_THRESHOLD = 10000
+FEED_BACKFILL_SIZE = 100
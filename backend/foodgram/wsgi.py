@@ -5,3 +5,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
 application = get_wsgi_application()
+
+from api.search import preload_ingredient_index  # noqa: E402
+from django.core.cache import close_caches  # noqa: E402
+from django.db import connections  # noqa: E402
+
+preload_ingredient_index()
+connections.close_all()
+close_caches()
@@ -71,9 +71,10 @@ class RecipeAdmin(ModelAdmin):
     get_image.short_description = "Изображение"
 
     def count_favorites(self, obj: Recipe) -> int:
-        return obj.in_favorites.count()
+        return obj.favorites_count
 
     count_favorites.short_description = "В избранном"
+    count_favorites.admin_order_field = "favorites_count"
 
 
 @register(Tag)
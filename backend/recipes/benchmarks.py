@@ -0,0 +1,141 @@
+from random import Random
+from time import perf_counter
+from typing import Callable, List
+
+from django.db import connection
+from django.db.models import QuerySet
+from recipes.models import AmountIngredient, Carts, Ingredient, Recipe, Tag
+from users.models import User
+
+seed_prefix = "benchmark"
+
+
+def in_batches(objects: List, size: int) -> List[List]:
+    return [objects[i:i + size] for i in range(0, len(objects), size)]
+
+
+def seed_recipes(
+    count: int, authors: int, tags: int, batch_size: int = 5000
+) -> List[int]:
+    random = Random(count)
+    users = User.objects.bulk_create(
+        User(
+            username=f"{seed_prefix}{i}",
+            email=f"{seed_prefix}{i}@example.com",
+            first_name=seed_prefix,
+            last_name=str(i),
+        )
+        for i in range(authors)
+    )
+    author_ids = list(
+        User.objects.filter(
+            username__in=[user.username for user in users]
+        ).values_list("id", flat=True)
+    )
+    Tag.objects.bulk_create(
+        Tag(
+            name=f"{seed_prefix}{i}",
+            color=f"#{0xBE0000 + i:06X}",
+            slug=f"{seed_prefix}{i}",
+        )
+        for i in range(tags)
+    )
+    tag_ids = list(
+        Tag.objects.filter(slug__startswith=seed_prefix).values_list(
+            "id", flat=True
+        )
+    )
+
+    for batch in in_batches(range(count), batch_size):
+        Recipe.objects.bulk_create(
+            Recipe(
+                author_id=author_ids[i % authors],
+                name=f"{seed_prefix}{i}",
+                text=seed_prefix,
+                cooking_time=random.randint(1, 120),
+                image=f"recipe_images/{seed_prefix}.png",
+            )
+            for i in batch
+        )
+    recipe_ids = list(
+        Recipe.objects.filter(author_id__in=author_ids).values_list(
+            "id", flat=True
+        )
+    )
+
+    if not tags:
+        return recipe_ids
+
+    through = Recipe.tags.through
+    for batch in in_batches(recipe_ids, batch_size):
+        through.objects.bulk_create(
+            through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in batch
+            for tag_id in random.sample(tag_ids, random.randint(1, 3))
+        )
+    return recipe_ids
+
+
+def seed_ingredients(
+    recipe_ids: List[int],
+    ingredients: int,
+    per_recipe: int,
+    batch_size: int = 5000,
+) -> None:
+    random = Random(len(recipe_ids))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"{seed_prefix}{i}", measurement_unit="г")
+        for i in range(ingredients)
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(name__startswith=seed_prefix).values_list(
+            "id", flat=True
+        )
+    )
+    for batch in in_batches(recipe_ids, batch_size // per_recipe):
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe_id=recipe_id,
+                ingredients_id=ingredient_id,
+                amount=random.randint(1, 500),
+            )
+            for recipe_id in batch
+            for ingredient_id in random.sample(ingredient_ids, per_recipe)
+        )
+
+
+def seed_carts(
+    user_ids: List[int],
+    recipe_ids: List[int],
+    per_user: int,
+    batch_size: int = 5000,
+) -> None:
+    random = Random(len(user_ids))
+    for batch in in_batches(user_ids, batch_size // per_user):
+        Carts.objects.bulk_create(
+            Carts(user_id=user_id, recipe_id=recipe_id)
+            for user_id in batch
+            for recipe_id in random.sample(recipe_ids, per_user)
+        )
+
+
+def analyze() -> None:
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def explain(queryset: QuerySet) -> str:
+    if connection.vendor == "postgresql":
+        return queryset.explain(analyze=True, buffers=True)
+    return queryset.explain()
+
+
+def measure(run: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        timings.append(perf_counter() - start)
+    return min(timings) * 1000
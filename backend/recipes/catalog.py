@@ -0,0 +1,135 @@
+import csv
+from io import StringIO
+from itertools import islice
+from json import JSONDecodeError, JSONDecoder
+from typing import IO, Iterable, Iterator, List, Tuple
+
+from django.db import connection
+from django.db.transaction import atomic
+from recipes.models import Ingredient
+
+ingredient_model = Ingredient._meta.label_lower
+ingredient_fields = "name", "measurement_unit"
+json_whitespace = " \t\r\n"
+
+
+def iter_json_array(stream: IO[str], chunk_size: int = 1 << 16) -> Iterator:
+    decoder = JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip(json_whitespace)
+    if not buffer.startswith("["):
+        raise ValueError("Ожидался JSON-массив.")
+
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if buffer[position:position + 1] == "]":
+            return
+
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def read_json(stream: IO[str]) -> Iterator[Tuple[str, str]]:
+    for number, item in enumerate(iter_json_array(stream), 1):
+        if isinstance(item, dict) and "model" in item:
+            if item["model"] != ingredient_model:
+                continue
+            item = item.get("fields", {})
+        try:
+            yield tuple(str(item[field]) for field in ingredient_fields)
+        except (KeyError, TypeError):
+            raise ValueError(f"Объект {number}: нет названия или единиц.")
+
+
+def read_csv(stream: IO[str]) -> Iterator[Tuple[str, str]]:
+    for number, row in enumerate(csv.reader(stream), 1):
+        if number == 1 and tuple(row) == ingredient_fields:
+            continue
+        if len(row) != 2:
+            raise ValueError(f"Строка {number}: ожидалось два столбца.")
+        yield row[0], row[1]
+
+
+def normalize(
+    rows: Iterable[Tuple[str, str]]
+) -> Iterator[Tuple[str, str]]:
+    max_lengths = [
+        Ingredient._meta.get_field(field).max_length
+        for field in ingredient_fields
+    ]
+    for row in rows:
+        row = tuple(value.strip() for value in row)
+        if not all(row):
+            raise ValueError(f"Пустое значение в {row}.")
+        if any(len(value) > size for value, size in zip(row, max_lengths)):
+            raise ValueError(f"Слишком длинное значение в {row}.")
+        yield row
+
+
+def batches(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def copy_batch(batch: List[Tuple[str, str]]) -> int:
+    buffer = StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    table = connection.ops.quote_name(Ingredient._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE ingredient_staging")
+        cursor.copy_expert(
+            "COPY ingredient_staging (name, measurement_unit) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            f"INSERT INTO {table} (name, measurement_unit) "
+            "SELECT name, measurement_unit FROM ingredient_staging "
+            "ON CONFLICT (name, measurement_unit) DO NOTHING"
+        )
+        return cursor.rowcount
+
+
+def insert_batch(batch: List[Tuple[str, str]]) -> int:
+    before = Ingredient.objects.count()
+    Ingredient.objects.bulk_create(
+        [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in batch
+        ],
+        ignore_conflicts=True,
+    )
+    return Ingredient.objects.count() - before
+
+
+@atomic
+def load_ingredients(
+    rows: Iterable[Tuple[str, str]], batch_size: int = 5000
+) -> Tuple[int, int]:
+    save_batch = insert_batch
+    if connection.vendor == "postgresql":
+        save_batch = copy_batch
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS ingredient_staging "
+                "(name text, measurement_unit text) ON COMMIT DROP"
+            )
+
+    inserted = total = 0
+    for batch in batches(normalize(rows), batch_size):
+        total += len(batch)
+        inserted += save_batch(batch)
+    return inserted, total - inserted
@@ -0,0 +1,56 @@
+from typing import Dict, Iterable
+
+from django.db.models import Count, F, Model, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Carts, Favorites, Recipe
+from users.models import Subscribe, User
+
+counters = {
+    Favorites: ("recipe", Recipe, "favorites_count"),
+    Carts: ("recipe", Recipe, "in_carts_count"),
+    Recipe: ("author", User, "recipes_count"),
+    Subscribe: ("author", User, "subscribers_count"),
+}
+
+
+def counted_id(instance: Model) -> int:
+    fk, _, _ = counters[type(instance)]
+    return getattr(instance, f"{fk}_id")
+
+
+def adjust_counter(source: type, ids: Iterable[int], delta: int) -> int:
+    _, model, field = counters[source]
+    queryset = model.objects.filter(id__in=ids)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def actual_count(source: type) -> Coalesce:
+    fk, _, _ = counters[source]
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(total=Count("id"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def reconcile_counters(dry_run: bool = False) -> Dict[str, int]:
+    drift = {}
+    for source, (_, model, field) in counters.items():
+        drifted = model.objects.annotate(actual=actual_count(source)).exclude(
+            **{field: F("actual")}
+        )
+        key = f"{model._meta.label}.{field}"
+        if dry_run:
+            drift[key] = drifted.count()
+        else:
+            drift[key] = model.objects.filter(
+                id__in=drifted.values("id")
+            ).update(**{field: actual_count(source)})
+    return drift
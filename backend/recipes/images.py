@@ -0,0 +1,121 @@
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha256
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections
+from django.db.transaction import on_commit
+from django.utils.deconstruct import deconstructible
+from PIL import Image, ImageOps
+
+recipe_image_renditions = settings.RECIPE_IMAGE_RENDITIONS
+recipe_image_formats = settings.RECIPE_IMAGE_FORMATS
+image_workers = settings.IMAGE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=image_workers, thread_name_prefix="recipe-images"
+)
+
+
+def file_digest(content: File) -> str:
+    digest = sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def addressed_name(name: str, digest: str) -> str:
+    directory, filename = os.path.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(directory, digest[:2], f"{digest}{extension}")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name: str, content: File, max_length=None) -> str:
+        name = addressed_name(name, file_digest(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
+
+
+def rendition_name(name: str, rendition: str, image_format: str) -> str:
+    return f"{os.path.splitext(name)[0]}_{rendition}.{image_format}"
+
+
+def rendition_urls(name: str, ready: bool) -> dict:
+    original = recipe_image_storage.url(name)
+    return {
+        rendition: {
+            image_format: recipe_image_storage.url(
+                rendition_name(name, rendition, image_format)
+            )
+            if ready
+            else original
+            for image_format in recipe_image_formats
+        }
+        for rendition in recipe_image_renditions
+    }
+
+
+def make_renditions(path: str, force: bool = False) -> str:
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        for rendition, size in recipe_image_renditions.items():
+            resized = ImageOps.fit(image, size)
+            for image_format in recipe_image_formats:
+                target = rendition_name(path, rendition, image_format)
+                if not force and os.path.exists(target):
+                    continue
+                tmp_path = f"{target}.processing"
+                resized.save(tmp_path, format=image_format.upper())
+                os.replace(tmp_path, target)
+    return path
+
+
+def mark_renditions_ready(recipe_id: int, name: str) -> None:
+    recipe = (
+        apps.get_model("recipes", "Recipe")
+        .objects.filter(id=recipe_id, image=name)
+        .first()
+    )
+    if recipe is not None and not recipe.renditions_ready:
+        recipe.renditions_ready = True
+        recipe.save(update_fields=("renditions_ready", "updated_at"))
+
+
+def process_image(recipe_id: int, name: str) -> None:
+    close_old_connections()
+    try:
+        make_renditions(recipe_image_storage.path(name))
+        mark_renditions_ready(recipe_id, name)
+    finally:
+        close_old_connections()
+
+
+def _log_failure(future: Future) -> None:
+    if future.exception() is not None:
+        logger.error(
+            "Не удалось обработать изображение рецепта",
+            exc_info=future.exception(),
+        )
+
+
+def schedule_image_processing(recipe_id: int, name: str) -> None:
+    def submit() -> None:
+        executor.submit(process_image, recipe_id, name).add_done_callback(
+            _log_failure
+        )
+
+    on_commit(submit)
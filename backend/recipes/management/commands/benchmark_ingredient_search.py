@@ -0,0 +1,72 @@
+import os
+
+from api.search import is_postgresql, rank_by_name, rank_by_name_in_two_queries
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic, set_rollback
+from recipes.benchmarks import analyze, explain, measure
+from recipes.catalog import load_ingredients, read_json
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает на PostgreSQL поиск ингредиентов одним запросом "
+        "через pg_trgm с двумя запросами istartswith и icontains. "
+        "Загруженный каталог откатывается."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=os.path.join(settings.BASE_DIR, "ingredients.json"),
+            help="Каталог ингредиентов в JSON.",
+        )
+        parser.add_argument(
+            "--copies",
+            type=int,
+            default=50,
+            help="Сколько копий каталога с разными суффиксами загрузить.",
+        )
+        parser.add_argument(
+            "--query",
+            action="append",
+            help="Строка поиска (можно повторять).",
+        )
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not is_postgresql():
+            raise CommandError("Бенчмарк pg_trgm требует PostgreSQL.")
+
+        with open(options["path"], encoding="utf-8") as stream:
+            catalog = list(read_json(stream))
+        with atomic():
+            load_ingredients(
+                (f"{name} {copy}" if copy else name, unit)
+                for copy in range(options["copies"])
+                for name, unit in catalog
+            )
+            analyze()
+            self.stdout.write(f"Ингредиентов: {Ingredient.objects.count()}.")
+            self.benchmark(options)
+            set_rollback(True)
+
+    def benchmark(self, options):
+        limit, repeat = options["limit"], options["repeat"]
+        for query in options["query"] or ("сах", "мол", "соль", "масло сл"):
+            ranked = rank_by_name(Ingredient.objects.all(), query)[:limit]
+            self.stdout.write(self.style.MIGRATE_HEADING(query))
+            self.stdout.write(explain(ranked))
+            trigram = measure(lambda: list(ranked.all()), repeat)
+            two_queries = measure(
+                lambda: rank_by_name_in_two_queries(
+                    Ingredient.objects.all(), query
+                ),
+                repeat,
+            )
+            self.stdout.write(
+                f"pg_trgm: {trigram:.2f} мс, "
+                f"istartswith + icontains: {two_queries:.2f} мс"
+            )
@@ -0,0 +1,104 @@
+import os
+from random import Random
+
+from api.renderers import (FastJSONRenderer, MessagePackRenderer, msgpack,
+                           orjson)
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.benchmarks import measure
+from recipes.catalog import read_json
+from rest_framework.renderers import JSONRenderer
+
+
+def recipe_page(count: int, catalog: list) -> dict:
+    random = Random(count)
+    tags = [
+        {"id": i, "name": f"тег{i}", "color": f"#{i:06X}", "slug": f"tag{i}"}
+        for i in range(1, 4)
+    ]
+    return {
+        "count": count * 10,
+        "next": "http://localhost/api/recipes/?page=2",
+        "previous": None,
+        "results": [
+            {
+                "id": i,
+                "tags": random.sample(tags, random.randint(1, 3)),
+                "author": {
+                    "email": f"author{i % 50}@example.com",
+                    "id": i % 50,
+                    "username": f"author{i % 50}",
+                    "first_name": "Имя",
+                    "last_name": "Фамилия",
+                    "is_subscribed": bool(i % 2),
+                },
+                "ingredients": [
+                    {**ingredient, "amount": random.randint(1, 500)}
+                    for ingredient in random.sample(catalog, 10)
+                ],
+                "is_favorited": bool(i % 3),
+                "is_in_shopping_cart": bool(i % 4),
+                "name": f"Рецепт {i}",
+                "image": f"http://localhost/media/recipe_images/{i}.png",
+                "renditions": {},
+                "text": "Описание рецепта. " * 20,
+                "cooking_time": random.randint(1, 120),
+            }
+            for i in range(1, count + 1)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время сериализации каталога ингредиентов и "
+        "сгенерированной страницы рецептов стандартным JSONRenderer, "
+        "orjson и MessagePack."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=os.path.join(settings.BASE_DIR, "ingredients.json"),
+            help="Каталог ингредиентов в JSON.",
+        )
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=100,
+            help="Сколько рецептов на сгенерированной странице.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with open(options["path"], encoding="utf-8") as stream:
+            catalog = [
+                {"id": i, "name": name, "measurement_unit": unit}
+                for i, (name, unit) in enumerate(read_json(stream), 1)
+            ]
+        payloads = {
+            "ingredients.json": catalog,
+            "Страница рецептов": recipe_page(options["recipes"], catalog),
+        }
+        renderers = {"JSONRenderer": JSONRenderer()}
+        if orjson is not None:
+            renderers["orjson"] = FastJSONRenderer()
+        else:
+            self.stderr.write("orjson не установлен, пропускаем.")
+        if msgpack is not None:
+            renderers["MessagePack"] = MessagePackRenderer()
+        else:
+            self.stderr.write("msgpack не установлен, пропускаем.")
+
+        for title, data in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            for name, renderer in renderers.items():
+                self.stdout.write(
+                    "{}: {:.2f} мс, {} байт".format(
+                        name,
+                        measure(
+                            lambda: renderer.render(data), options["repeat"]
+                        ),
+                        len(renderer.render(data)),
+                    )
+                )
@@ -0,0 +1,92 @@
+from api.shopping_list import shopping_list
+from django.core.management.base import BaseCommand
+from django.db.models import F, Sum
+from django.db.transaction import atomic, set_rollback
+from recipes.benchmarks import (analyze, explain, measure, seed_carts,
+                                seed_ingredients, seed_prefix, seed_recipes)
+from recipes.models import AmountIngredient, Recipe, ShoppingListItem
+from users.models import User
+
+
+def aggregated_shopping_list(user):
+    return (
+        AmountIngredient.objects.filter(recipe__in_carts__user=user)
+        .values(
+            name=F("ingredients__name"),
+            measurement=F("ingredients__measurement_unit"),
+        )
+        .annotate(amount=Sum("amount"))
+        .order_by("name", "measurement")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу тестовыми рецептами и корзинами и сравнивает "
+        "чтение готового списка покупок с подсчётом по корзине. "
+        "Все созданные данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=20_000)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument("--per-recipe", type=int, default=10)
+        parser.add_argument("--per-cart", type=int, default=15)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with atomic():
+            self.stdout.write(
+                f"Создаём {options['recipes']} рецептов и "
+                f"{options['users']} корзин..."
+            )
+            recipe_ids = seed_recipes(
+                options["recipes"], options["users"], tags=0
+            )
+            seed_ingredients(
+                recipe_ids, options["ingredients"], options["per_recipe"]
+            )
+            user_ids = list(
+                User.objects.filter(
+                    username__startswith=seed_prefix
+                ).values_list("id", flat=True)
+            )
+            seed_carts(user_ids, recipe_ids, options["per_cart"])
+            ShoppingListItem.objects.rebuild(user_ids)
+            analyze()
+            self.benchmark(User.objects.get(id=user_ids[0]), options)
+            set_rollback(True)
+
+    def benchmark(self, user, options):
+        repeat = options["repeat"]
+        readers = {
+            "ShoppingListItem": shopping_list(user),
+            "AmountIngredient + Sum": aggregated_shopping_list(user),
+        }
+        for title, queryset in readers.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(explain(queryset))
+            self.stdout.write(
+                "Чтение: {:.2f} мс, строк: {}".format(
+                    measure(lambda: list(queryset.all()), repeat),
+                    queryset.count(),
+                )
+            )
+
+        recipe_id = (
+            Recipe.objects.exclude(in_carts__user=user)
+            .values_list("id", flat=True)
+            .first()
+        )
+
+        def add_and_remove():
+            ShoppingListItem.objects.add_recipe(user.id, recipe_id)
+            ShoppingListItem.objects.remove_recipe(user.id, recipe_id)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Запись"))
+        self.stdout.write(
+            "add_recipe + remove_recipe: {:.2f} мс".format(
+                measure(add_and_remove, repeat)
+            )
+        )
@@ -0,0 +1,62 @@
+from api.paginators import PageLimitPagination
+from api.search import filter_by_tags
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic, set_rollback
+from recipes.benchmarks import (analyze, explain, measure, seed_prefix,
+                                seed_recipes)
+from recipes.models import Recipe, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу тестовыми рецептами и сравнивает планы и время "
+        "фильтрации по тегам через JOIN с DISTINCT и через EXISTS. "
+        "Все созданные данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100_000)
+        parser.add_argument("--authors", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument(
+            "--filter-tags",
+            type=int,
+            default=3,
+            help="Сколько тегов передать в фильтр.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with atomic():
+            self.stdout.write(f"Создаём {options['recipes']} рецептов...")
+            seed_recipes(
+                options["recipes"], options["authors"], options["tags"]
+            )
+            analyze()
+            self.benchmark(options)
+            set_rollback(True)
+
+    def benchmark(self, options):
+        slugs = list(
+            Tag.objects.filter(slug__startswith=seed_prefix)
+            .order_by("id")
+            .values_list("slug", flat=True)[: options["filter_tags"]]
+        )
+        page_size = PageLimitPagination.page_size
+        filters = {
+            "tags__slug__in + distinct()": Recipe.objects.filter(
+                tags__slug__in=slugs
+            ).distinct(),
+            "Exists": filter_by_tags(Recipe.objects.all(), slugs),
+        }
+        for title, queryset in filters.items():
+            page = queryset.select_related("author")[:page_size]
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(explain(page))
+            self.stdout.write(
+                "Страница: {:.1f} мс, count(): {:.1f} мс, рецептов: {}".format(
+                    measure(lambda: list(page.all()), options["repeat"]),
+                    measure(queryset.count, options["repeat"]),
+                    queryset.count(),
+                )
+            )
@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.transfer import export_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает рецепты в NDJSON: один рецепт в строке, со ссылками "
+        "на автора, теги, ингредиенты и изображение."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default="-",
+            help="Файл для выгрузки, по умолчанию стандартный вывод.",
+        )
+        parser.add_argument(
+            "--author",
+            action="append",
+            help="Выгрузить только рецепты автора (можно повторять).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество рецептов, читаемых из базы за раз.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options["author"]:
+            recipes = recipes.filter(author__username__in=options["author"])
+
+        if options["path"] == "-":
+            exported = export_recipes(
+                sys.stdout, recipes, options["batch_size"]
+            )
+            self.stderr.write(f"Выгружено рецептов: {exported}.")
+            return
+
+        with open(options["path"], "w", encoding="utf-8") as stream:
+            exported = export_recipes(stream, recipes, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Выгружено рецептов: {exported}.")
+        )
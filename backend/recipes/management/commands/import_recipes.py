@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from api.cache import author_version, bump_version
+from django.core.management.base import BaseCommand, CommandError
+from recipes.transfer import RecipeImporter, import_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает рецепты из NDJSON, выгруженного export_recipes, "
+        "пакетами и с продолжением после прерывания."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл NDJSON с рецептами.")
+        parser.add_argument(
+            "--images",
+            help=(
+                "Каталог MEDIA_ROOT источника, откуда копировать "
+                "изображения, которых ещё нет в хранилище."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество рецептов в одной транзакции.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов обработки изображений.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл с номером последней загруженной строки.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать загрузку с начала файла, игнорируя checkpoint.",
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"] or f"{options['path']}.checkpoint"
+        if options["restart"] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            importer = RecipeImporter(options["images"], pool)
+            try:
+                with open(options["path"], encoding="utf-8") as stream:
+                    for line, author_ids in import_recipes(
+                        stream, importer, options["batch_size"], checkpoint
+                    ):
+                        if author_ids:
+                            bump_version(
+                                "recipes", *map(author_version, author_ids)
+                            )
+                        self.stdout.write(f"Обработано строк: {line}.")
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+
+        for error in importer.errors:
+            self.stderr.write(error)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено рецептов: {importer.stats['imported']}, "
+                f"уже были в базе: {importer.stats['existing']}, "
+                f"пропущено: {importer.stats['skipped']}."
+            )
+        )
@@ -0,0 +1,49 @@
+from api.cache import bump_version_on_commit
+from django.core.management.base import BaseCommand, CommandError
+from recipes.catalog import load_ingredients, read_csv, read_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает каталог ингредиентов из JSON или CSV пакетами, "
+        "пропуская уже существующие пары название + единицы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу JSON или CSV.")
+        parser.add_argument(
+            "--format",
+            choices=("json", "csv"),
+            help="Формат файла, по умолчанию определяется по расширению.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество строк в одном пакете.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.rsplit(".", 1)[-1].lower()
+        if file_format not in ("json", "csv"):
+            raise CommandError("Укажите формат файла: --format json или csv.")
+
+        read = read_json if file_format == "json" else read_csv
+        try:
+            with open(path, encoding="utf-8", newline="") as stream:
+                inserted, existing = load_ingredients(
+                    read(stream), options["batch_size"]
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        if inserted:
+            bump_version_on_commit("catalog", "ingredients")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Добавлено ингредиентов: {inserted}, "
+                f"уже были в базе: {existing}."
+            )
+        )
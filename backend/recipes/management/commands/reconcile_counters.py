@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет счётчики избранного, корзин, рецептов и подписчиков "
+        "с фактическими данными и исправляет расхождения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать количество расхождений.",
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile_counters(dry_run=options["dry_run"])
+        for counter, rows in drift.items():
+            self.stdout.write(f"{counter}: {rows}")
+
+        total = sum(drift.values())
+        if options["dry_run"]:
+            self.stdout.write(f"Строк с расхождениями: {total}.")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Исправлено строк: {total}.")
+            )
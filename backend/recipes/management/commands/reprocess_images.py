@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from recipes.images import make_renditions, mark_renditions_ready
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Заново создаёт копии изображений рецептов на всех ядрах."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов обработки.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Перезаписать уже созданные копии.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="").only("id", "image")
+        processed = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = {
+                pool.submit(
+                    make_renditions, recipe.image.path, options["force"]
+                ): recipe
+                for recipe in recipes
+            }
+            for future in as_completed(futures):
+                recipe = futures[future]
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(f"{recipe.image}: {future.exception()}")
+                    continue
+                mark_renditions_ready(recipe.id, recipe.image.name)
+                processed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано изображений: {processed}, ошибок: {failed}."
+            )
+        )
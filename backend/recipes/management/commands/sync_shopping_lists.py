@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет сохранённые списки покупок с корзинами и, при необходимости, "
+        "пересобирает их."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Пересобрать списки пользователей с расхождениями.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересобрать списки всех пользователей.",
+        )
+
+    def handle(self, *args, **options):
+        expected = defaultdict(dict)
+        for row in ShoppingListItem.objects.expected().iterator():
+            expected[row["user_id"]][row["ingredients_id"]] = row["total"]
+
+        stored = defaultdict(dict)
+        for user_id, ingredient_id, amount in (
+            ShoppingListItem.objects.values_list(
+                "user_id", "ingredient_id", "amount"
+            ).iterator()
+        ):
+            stored[user_id][ingredient_id] = amount
+
+        user_ids = set(expected) | set(stored)
+        if not options["all"]:
+            user_ids = {
+                user_id
+                for user_id in user_ids
+                if expected.get(user_id) != stored.get(user_id)
+            }
+
+        self.stdout.write(f"Списков с расхождениями: {len(user_ids)}.")
+        if not (options["rebuild"] or options["all"]):
+            return
+
+        ShoppingListItem.objects.rebuild(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано списков: {len(user_ids)}.")
+        )
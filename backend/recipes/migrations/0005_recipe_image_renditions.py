@@ -0,0 +1,24 @@
+# Generated by Django 3.2.18 on 2026-10-17 06:04
+
+from django.db import migrations, models
+import recipes.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_tags_tag_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Копии изображения готовы'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(help_text='Выберите изображение рецепта', storage=recipes.images.ContentAddressedStorage(), upload_to='recipe_images/', verbose_name='Изображение'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+trigram_indexes = (
+    ('recipes_ingredient_name_trgm_idx', 'recipes_ingredient'),
+    ('recipes_recipe_name_trgm_idx', 'recipes_recipe'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    for index, table in trigram_indexes:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index} ON {table} '
+            'USING gin (lower(name) gin_trgm_ops);'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index, _ in trigram_indexes:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index};')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
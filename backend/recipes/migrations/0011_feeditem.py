@@ -0,0 +1,79 @@
+# Generated by Django 3.2.18 on 2026-10-17 06:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscribe = apps.get_model('users', 'Subscribe')
+    User = apps.get_model('users', 'User')
+    authors = User.objects.filter(
+        subscribers_count__gt=0,
+        subscribers_count__lt=settings.FEED_CELEBRITY_THRESHOLD,
+    ).values_list('id', flat=True)
+    for author_id in authors.iterator():
+        recipes = list(
+            Recipe.objects.filter(author_id=author_id)
+            .order_by('-pub_date', '-id')
+            .values('id', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+        )
+        if not recipes:
+            continue
+        subscribers = Subscribe.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        batch = []
+        for user_id in subscribers.iterator(
+            chunk_size=settings.FEED_FANOUT_BATCH_SIZE
+        ):
+            batch.extend(
+                FeedItem(
+                    user_id=user_id,
+                    recipe_id=recipe['id'],
+                    author_id=author_id,
+                    pub_date=recipe['pub_date'],
+                )
+                for recipe in recipes
+            )
+            if len(batch) >= settings.FEED_FANOUT_BATCH_SIZE:
+                FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0010_recipe_author_pub_date_idx'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор рецепта')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='in_feeds', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Владелец ленты')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Рецепты в лентах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feeditem_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,26 @@
+from collections import defaultdict
+from heapq import merge
+from typing import Iterable, List, Tuple
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import CASCADE, SET_NULL, DateTimeField, UniqueConstraint
-from PIL import Image
-from users.models import User
+from django.db.models import (CASCADE, SET_NULL, DateTimeField, F, Q, QuerySet,
+                              Sum, UniqueConstraint)
+from django.db.transaction import atomic
+from recipes.images import (recipe_image_storage, rendition_urls,
+                            schedule_image_processing)
+from users.models import ManagedFieldsMixin, Subscribe, User
 
 max_legth = settings.MAX_LEGTH
 max_len_recipes = settings.MAX_LEN_RECIPES
 min_cook_time = settings.MIN_COOK_TIME
 max_cook_time = settings.MAX_COOK_TIME
-recipe_image_size = settings.RECIPE_IMAGE_SIZE
 min_amount_imgredients = settings.MIN_AMOUNT_INGREDIENTS
 max_amount_imgredients = settings.MAX_AMOUNT_INGREDIENTS
+feed_fanout_batch_size = settings.FEED_FANOUT_BATCH_SIZE
+feed_celebrity_threshold = settings.FEED_CELEBRITY_THRESHOLD
+feed_backfill_size = settings.FEED_BACKFILL_SIZE
 
 User = get_user_model()
 
@@ -85,7 +94,7 @@ class Ingredient(models.Model):
         super().clean()
 
 
-class Recipe(models.Model):
+class Recipe(ManagedFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         verbose_name="Автор рецепта",
@@ -116,6 +125,12 @@ class Recipe(models.Model):
         verbose_name="Изображение",
         help_text="Выберите изображение рецепта",
         upload_to="recipe_images/",
+        storage=recipe_image_storage,
+    )
+    renditions_ready = models.BooleanField(
+        verbose_name="Копии изображения готовы",
+        default=False,
+        editable=False,
     )
     text = models.TextField(
         verbose_name="Описание рецепта",
@@ -133,6 +148,23 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="В избранном",
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name="В списках покупок",
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ("favorites_count", "in_carts_count")
+    background_fields = ("renditions_ready",)
 
     class Meta:
         verbose_name = "Рецепт"
@@ -144,6 +176,16 @@ class Recipe(models.Model):
                 name="unique_for_author",
             ),
         )
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-id"),
+                name="recipe_pub_date_id_idx",
+            ),
+            models.Index(
+                fields=("author", "-pub_date", "-id"),
+                name="recipe_author_pub_date_idx",
+            ),
+        )
 
     def __str__(self) -> str:
         return f"{self.name}. Автор: {self.author.username}"
@@ -152,11 +194,29 @@ class Recipe(models.Model):
         self.name = self.name.capitalize()
         super().clean()
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        image = self.__dict__.get("image")
+        self._saved_image = getattr(image, "name", image)
+
     def save(self, *args, **kwargs) -> None:
+        image_changed = "image" not in self.get_deferred_fields() and (
+            not self.image._committed or self.image.name != self._saved_image
+        )
+        reset_renditions = image_changed and not self._state.adding
+        if image_changed:
+            self.renditions_ready = False
         super().save(*args, **kwargs)
-        image = Image.open(self.image.path)
-        image = image.resize(recipe_image_size)
-        image.save(self.image.path)
+        if reset_renditions:
+            Recipe.objects.filter(id=self.id).update(renditions_ready=False)
+        if image_changed and self.image:
+            schedule_image_processing(self.id, self.image.name)
+        if image_changed:
+            self._saved_image = self.image.name
+
+    @property
+    def renditions(self) -> dict:
+        return rendition_urls(self.image.name, self.renditions_ready)
 
 
 class AmountIngredient(models.Model):
@@ -268,3 +328,269 @@ class Carts(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user} -> {self.recipe}"
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    def expected(self, user_ids: Iterable[int] or None = None) -> QuerySet:
+        amounts = AmountIngredient.objects.all()
+        if user_ids is None:
+            amounts = amounts.filter(recipe__in_carts__isnull=False)
+        else:
+            amounts = amounts.filter(recipe__in_carts__user_id__in=user_ids)
+        return (
+            amounts.values(
+                "ingredients_id", user_id=F("recipe__in_carts__user_id")
+            )
+            .annotate(total=Sum("amount"))
+            .order_by()
+        )
+
+    def add_recipe(self, user_id: int, recipe_id: int) -> None:
+        self._apply_recipe(user_id, recipe_id, 1)
+
+    def remove_recipe(self, user_id: int, recipe_id: int) -> None:
+        self._apply_recipe(user_id, recipe_id, -1)
+
+    @atomic
+    def _apply_recipe(self, user_id: int, recipe_id: int, sign: int) -> None:
+        amounts = dict(
+            AmountIngredient.objects.filter(recipe_id=recipe_id).values_list(
+                "ingredients_id", "amount"
+            )
+        )
+        if not amounts:
+            return
+
+        list(User.objects.select_for_update().filter(id=user_id).only("id"))
+        items = {
+            item.ingredient_id: item
+            for item in self.filter(
+                user_id=user_id, ingredient_id__in=amounts
+            )
+        }
+        created, updated, emptied = [], [], []
+        for ingredient_id, amount in amounts.items():
+            item = items.get(ingredient_id)
+            if item is None:
+                if sign > 0:
+                    created.append(
+                        self.model(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=amount,
+                        )
+                    )
+                continue
+            item.amount += sign * amount
+            if item.amount > 0:
+                updated.append(item)
+            else:
+                emptied.append(item.id)
+
+        self.bulk_create(created)
+        self.bulk_update(updated, ("amount",))
+        self.filter(id__in=emptied).delete()
+
+    @atomic
+    def rebuild(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+        list(
+            User.objects.select_for_update()
+            .filter(id__in=user_ids)
+            .only("id")
+        )
+        self.filter(user_id__in=user_ids).delete()
+        self.bulk_create(
+            self.model(
+                user_id=row["user_id"],
+                ingredient_id=row["ingredients_id"],
+                amount=row["total"],
+            )
+            for row in self.expected(user_ids)
+        )
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name="Владелец списка покупок",
+        related_name="shopping_list",
+        on_delete=CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name="Ингредиент",
+        related_name="in_shopping_lists",
+        on_delete=CASCADE,
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name="Общее количество",
+        default=0,
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списках покупок"
+        constraints = (
+            UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_list_item",
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.user} -> {self.amount} {self.ingredient}"
+
+
+class FeedQuerySet(models.QuerySet):
+    def fan_out(self, *recipe_ids: int) -> None:
+        recipes = defaultdict(list)
+        for recipe in Recipe.objects.filter(
+            id__in=recipe_ids,
+            author__subscribers_count__lt=feed_celebrity_threshold,
+        ).values("id", "author_id", "pub_date"):
+            recipes[recipe["author_id"]].append(recipe)
+        if not recipes:
+            return
+
+        subscriptions = (
+            Subscribe.objects.filter(author_id__in=recipes)
+            .order_by("author_id", "user_id")
+            .values_list("author_id", "user_id")
+        )
+        batch = []
+        for author_id, user_id in subscriptions.iterator(
+            chunk_size=feed_fanout_batch_size
+        ):
+            batch.extend(
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe["id"],
+                    author_id=author_id,
+                    pub_date=recipe["pub_date"],
+                )
+                for recipe in recipes[author_id]
+            )
+            if len(batch) >= feed_fanout_batch_size:
+                self.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        self.bulk_create(batch, ignore_conflicts=True)
+
+    def backfill(self, user_id: int, author_id: int) -> None:
+        if User.objects.filter(
+            id=author_id, subscribers_count__gte=feed_celebrity_threshold
+        ).exists():
+            return
+
+        recipes = (
+            Recipe.objects.filter(author_id=author_id)
+            .order_by("-pub_date", "-id")
+            .values("id", "pub_date")[:feed_backfill_size]
+        )
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe["id"],
+                    author_id=author_id,
+                    pub_date=recipe["pub_date"],
+                )
+                for recipe in recipes
+            ),
+            ignore_conflicts=True,
+        )
+
+    def trim(self, user_id: int, author_id: int) -> None:
+        self.filter(user_id=user_id, author_id=author_id).delete()
+
+    def page(
+        self, user_id: int, limit: int, after: Tuple or None = None
+    ) -> List[Tuple]:
+        def keyset(queryset: QuerySet, id_field: str) -> QuerySet:
+            if after is None:
+                return queryset
+            pub_date, pk = after
+            return queryset.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, **{f"{id_field}__lt": pk})
+            )
+
+        pushed = (
+            keyset(self.filter(user_id=user_id), "recipe_id")
+            .order_by("-pub_date", "-recipe_id")
+            .values_list("pub_date", "recipe_id")[:limit]
+        )
+        pulled = (
+            keyset(
+                Recipe.objects.filter(
+                    author_id__in=Subscribe.objects.filter(
+                        user_id=user_id,
+                        author__subscribers_count__gte=(
+                            feed_celebrity_threshold
+                        ),
+                    ).values("author_id")
+                ),
+                "id",
+            )
+            .order_by("-pub_date", "-id")
+            .values_list("pub_date", "id")[:limit]
+        )
+
+        rows = []
+        for row in merge(pushed, pulled, reverse=True):
+            if rows and rows[-1] == row:
+                continue
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name="Владелец ленты",
+        related_name="feed",
+        on_delete=CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        related_name="in_feeds",
+        on_delete=CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор рецепта",
+        related_name="+",
+        on_delete=CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации",
+    )
+
+    objects = FeedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Рецепт в ленте"
+        verbose_name_plural = "Рецепты в лентах"
+        constraints = (
+            UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_feed_item",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date", "-recipe"),
+                name="feeditem_user_pub_date_idx",
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.user} -> {self.recipe}"
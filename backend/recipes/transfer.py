@@ -0,0 +1,350 @@
+import json
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import Executor
+from itertools import groupby
+from typing import IO, Dict, Iterable, Iterator, List, Set, Tuple
+
+from django.core.files import File
+from django.db.models import F, QuerySet
+from django.db.transaction import atomic
+from django.utils.dateparse import parse_datetime
+from recipes.counters import adjust_counter
+from recipes.images import (addressed_name, file_digest, make_renditions,
+                            recipe_image_storage)
+from recipes.models import AmountIngredient, FeedItem, Ingredient, Recipe, Tag
+from users.models import User
+
+recipe_fields = "name", "text", "cooking_time"
+required_keys = {
+    "author",
+    *recipe_fields,
+    "pub_date",
+    "image",
+    "tags",
+    "ingredients",
+}
+image_field = Recipe._meta.get_field("image")
+
+
+def stored_digest(name: str) -> str or None:
+    if not name:
+        return None
+    try:
+        with recipe_image_storage.open(name) as content:
+            return file_digest(content)
+    except OSError:
+        return None
+
+
+def export_rows(queryset: QuerySet, batch_size: int) -> Iterator[dict]:
+    queryset = queryset.order_by("id").values(
+        "id",
+        *recipe_fields,
+        "image",
+        "pub_date",
+        author_username=F("author__username"),
+    )
+    last_id = 0
+    while True:
+        recipes = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not recipes:
+            return
+        last_id = recipes[-1]["id"]
+        recipe_ids = [recipe["id"] for recipe in recipes]
+
+        tags = defaultdict(list)
+        for recipe_id, slug in (
+            Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+            .order_by("tag__slug")
+            .values_list("recipe_id", "tag__slug")
+        ):
+            tags[recipe_id].append(slug)
+
+        ingredients = defaultdict(list)
+        for recipe_id, *ingredient in (
+            AmountIngredient.objects.filter(recipe_id__in=recipe_ids)
+            .order_by("ingredients__name")
+            .values_list(
+                "recipe_id",
+                "ingredients__name",
+                "ingredients__measurement_unit",
+                "amount",
+            )
+        ):
+            ingredients[recipe_id].append(ingredient)
+
+        for recipe in recipes:
+            yield {
+                "author": recipe["author_username"],
+                **{field: recipe[field] for field in recipe_fields},
+                "pub_date": recipe["pub_date"].isoformat(),
+                "image": recipe["image"],
+                "image_sha256": stored_digest(recipe["image"]),
+                "tags": tags[recipe["id"]],
+                "ingredients": ingredients[recipe["id"]],
+            }
+
+
+def export_recipes(
+    stream: IO[str], queryset: QuerySet, batch_size: int = 500
+) -> int:
+    exported = 0
+    for row in export_rows(queryset, batch_size):
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write("\n")
+        exported += 1
+    return exported
+
+
+def read_rows(
+    stream: IO[str], skip: int = 0
+) -> Iterator[Tuple[int, dict]]:
+    for number, line in enumerate(stream, 1):
+        if number <= skip or not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            raise ValueError(f"Строка {number}: {error}")
+
+
+def read_batches(
+    rows: Iterable[Tuple[int, dict]], size: int
+) -> Iterator[List[Tuple[int, dict]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_image(
+    source_root: str or None, name: str, digest: str or None
+) -> str:
+    upload_name = image_field.generate_filename(None, os.path.basename(name))
+    stored = addressed_name(upload_name, digest) if digest else None
+    if stored is None or not recipe_image_storage.exists(stored):
+        if source_root is None:
+            if not recipe_image_storage.exists(name):
+                raise ValueError(f"{name}: файла нет в хранилище.")
+            path = recipe_image_storage.path(name)
+        else:
+            path = os.path.join(source_root, name)
+        with open(path, "rb") as content:
+            content = File(content)
+            if digest and file_digest(content) != digest:
+                raise ValueError(f"{name}: содержимое не совпадает с хешем.")
+            stored = recipe_image_storage.save(upload_name, content)
+    make_renditions(recipe_image_storage.path(stored))
+    return stored
+
+
+class RecipeImporter:
+    def __init__(self, images_root: str or None, pool: Executor) -> None:
+        self.images_root = images_root
+        self.pool = pool
+        self.stats = Counter()
+        self.errors: List[str] = []
+
+    def skip(self, number: int, reason: str) -> None:
+        self.stats["skipped"] += 1
+        self.errors.append(f"Строка {number}: {reason}")
+
+    def resolve(
+        self, batch: List[Tuple[int, dict]]
+    ) -> List[Tuple[int, dict, dict]]:
+        rows = [row for _, row in batch]
+        authors = User.objects.in_bulk(
+            {row.get("author") for row in rows}, field_name="username"
+        )
+        tags = Tag.objects.in_bulk(
+            {slug for row in rows for slug in row.get("tags", ())},
+            field_name="slug",
+        )
+        names = {
+            item[0] for row in rows for item in row.get("ingredients", ())
+        }
+        ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.filter(
+                name__in=names
+            ).values_list("id", "name", "measurement_unit")
+        }
+        existing = set(
+            Recipe.objects.filter(
+                author__in=authors.values(),
+                name__in={row.get("name") for row in rows},
+            ).values_list("author_id", "name")
+        )
+
+        resolved = []
+        for number, row in batch:
+            missing = required_keys - row.keys()
+            if missing:
+                self.skip(number, f"нет полей {', '.join(sorted(missing))}.")
+                continue
+            pub_date = parse_datetime(row["pub_date"])
+            if pub_date is None:
+                self.skip(number, "неверная дата публикации.")
+                continue
+            author = authors.get(row["author"])
+            if author is None:
+                self.skip(number, f"нет автора {row.get('author')}.")
+                continue
+            if (author.id, row.get("name")) in existing:
+                self.stats["existing"] += 1
+                continue
+            missing = [slug for slug in row["tags"] if slug not in tags]
+            missing += [
+                f"{name} ({unit})"
+                for name, unit, _ in row["ingredients"]
+                if (name, unit) not in ingredients
+            ]
+            if missing:
+                self.skip(number, f"не найдены {', '.join(missing)}.")
+                continue
+
+            amounts = Counter()
+            for name, unit, amount in row["ingredients"]:
+                amounts[ingredients[(name, unit)]] += int(amount)
+
+            existing.add((author.id, row["name"]))
+            resolved.append(
+                (
+                    number,
+                    row,
+                    {
+                        "author": author,
+                        "pub_date": pub_date,
+                        "tags": {tags[slug].id for slug in row["tags"]},
+                        "ingredients": amounts,
+                    },
+                )
+            )
+        return resolved
+
+    def import_images(
+        self, resolved: List[Tuple[int, dict, dict]]
+    ) -> Tuple[List[Tuple[int, dict, dict]], Dict[str, str]]:
+        digests = {
+            row["image"]: row.get("image_sha256")
+            for _, row, _ in resolved
+            if row["image"]
+        }
+
+        futures = {
+            name: self.pool.submit(
+                import_image, self.images_root, name, digest
+            )
+            for name, digest in digests.items()
+        }
+        failed, stored = set(), {}
+        for name, future in futures.items():
+            if future.exception() is not None:
+                failed.add(name)
+                self.errors.append(str(future.exception()))
+            else:
+                stored[name] = future.result()
+
+        imported = []
+        for number, row, refs in resolved:
+            if row["image"] in failed:
+                self.skip(number, f"изображение {row['image']}.")
+            else:
+                imported.append((number, row, refs))
+        return imported, stored
+
+    @atomic
+    def save(
+        self, resolved: List[Tuple[int, dict, dict]], stored: Dict[str, str]
+    ) -> Set[int]:
+        recipes = [
+            Recipe(
+                author=refs["author"],
+                image=stored.get(row["image"], row["image"]),
+                renditions_ready=row["image"] in stored,
+                **{field: row[field] for field in recipe_fields},
+            )
+            for _, row, refs in resolved
+        ]
+        Recipe.objects.bulk_create(recipes)
+
+        ids = {
+            (author_id, name): pk
+            for pk, author_id, name in Recipe.objects.filter(
+                author__in={recipe.author_id for recipe in recipes},
+                name__in={recipe.name for recipe in recipes},
+            ).values_list("id", "author_id", "name")
+        }
+        for recipe, (_, _, refs) in zip(recipes, resolved):
+            recipe.id = ids[(recipe.author_id, recipe.name)]
+            recipe.pub_date = refs["pub_date"]
+        Recipe.objects.bulk_update(recipes, ("pub_date",))
+
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe, (_, _, refs) in zip(recipes, resolved)
+            for tag_id in refs["tags"]
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe_id=recipe.id,
+                ingredients_id=ingredient_id,
+                amount=amount,
+            )
+            for recipe, (_, _, refs) in zip(recipes, resolved)
+            for ingredient_id, amount in refs["ingredients"].items()
+        )
+
+        per_author = Counter(recipe.author_id for recipe in recipes)
+        for delta, authors in groupby(
+            sorted(per_author.items(), key=lambda item: item[1]),
+            key=lambda item: item[1],
+        ):
+            adjust_counter(Recipe, [author for author, _ in authors], delta)
+        FeedItem.objects.fan_out(*(recipe.id for recipe in recipes))
+
+        self.stats["imported"] += len(recipes)
+        return set(per_author)
+
+    def import_batch(self, batch: List[Tuple[int, dict]]) -> Set[int]:
+        try:
+            resolved = self.resolve(batch)
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"Строки {batch[0][0]}-{batch[-1][0]}: {error}")
+        resolved, stored = self.import_images(resolved)
+        if not resolved:
+            return set()
+        return self.save(resolved, stored)
+
+
+def read_checkpoint(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as checkpoint:
+            return json.load(checkpoint)["line"]
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path: str, line: int) -> None:
+    with open(f"{path}.tmp", "w", encoding="utf-8") as checkpoint:
+        json.dump({"line": line}, checkpoint)
+    os.replace(f"{path}.tmp", path)
+
+
+def import_recipes(
+    stream: IO[str],
+    importer: RecipeImporter,
+    batch_size: int = 500,
+    checkpoint: str or None = None,
+) -> Iterator[Tuple[int, Set[int]]]:
+    skip = read_checkpoint(checkpoint) if checkpoint else 0
+    for batch in read_batches(read_rows(stream, skip), batch_size):
+        author_ids = importer.import_batch(batch)
+        if checkpoint:
+            write_checkpoint(checkpoint, batch[-1][0])
+        yield batch[-1][0], author_ids
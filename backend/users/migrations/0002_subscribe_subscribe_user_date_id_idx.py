@@ -0,0 +1,17 @@
+# Generated by Django 3.2.18 on 2026-10-17 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscribe',
+            index=models.Index(fields=['user', '-date_added', '-id'], name='subscribe_user_date_id_idx'),
+        ),
+    ]
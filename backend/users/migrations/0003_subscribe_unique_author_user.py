@@ -0,0 +1,31 @@
+# Generated by Django 3.2.18 on 2026-10-17 06:12
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_subscriptions(apps, schema_editor):
+    Subscribe = apps.get_model('users', 'Subscribe')
+    keep = (
+        Subscribe.objects.values('user_id', 'author_id')
+        .annotate(first_id=Min('id'))
+        .values('first_id')
+    )
+    Subscribe.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_subscribe_subscribe_user_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_subscriptions, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='subscribe',
+            constraint=models.UniqueConstraint(fields=('author', 'user'), name='\nusers_subscribe вы уже подписаны на автора\n'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+prefix_indexes = (
+    ('users_user_username_prefix_idx', 'username'),
+    ('users_user_first_name_prefix_idx', 'first_name'),
+    ('users_user_last_name_prefix_idx', 'last_name'),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index, column in prefix_indexes:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index} ON users_user '
+            f'(lower({column}) text_pattern_ops);'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index, _ in prefix_indexes:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index};')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
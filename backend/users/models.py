@@ -1,5 +1,6 @@
 import re
 import unicodedata
+from typing import Tuple
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
@@ -12,7 +13,33 @@ max_password_length = settings.MAX_PASSWORD_LENGTH
 max_email_length = settings.MAX_EMAIL_LENGTH
 
 
-class User(AbstractUser):
+class ManagedFieldsMixin:
+    counter_fields: Tuple[str, ...] = ()
+    background_fields: Tuple[str, ...] = ()
+
+    def save(self, *args, **kwargs) -> None:
+        if (
+            not self._state.adding
+            and not args
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            skipped = {
+                *self.counter_fields,
+                *self.background_fields,
+                *self.get_deferred_fields(),
+            }
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in skipped
+                and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(ManagedFieldsMixin, AbstractUser):
     username = models.CharField(
         verbose_name="Логин",
         max_length=max_username_length,
@@ -44,6 +71,18 @@ class User(AbstractUser):
         verbose_name="Активирован",
         default=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="Количество рецептов",
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name="Количество подписчиков",
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ("recipes_count", "subscribers_count")
 
     class Meta:
         verbose_name = "Пользователь"
@@ -101,6 +140,21 @@ class Subscribe(models.Model):
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        indexes = (
+            models.Index(
+                fields=("user", "-date_added", "-id"),
+                name="subscribe_user_date_id_idx",
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    "author",
+                    "user",
+                ),
+                name="\n%(app_label)s_%(class)s вы уже подписаны на автора\n",
+            ),
+        )
 
     def __str__(self) -> str:
         return f"{self.user.username} -> {self.author.username}"